@@ -0,0 +1,55 @@
+"""Measure the one-off and per-render cost of the process-wide asset registry.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_assets
+"""
+import io
+import json
+import time
+import contextlib
+
+from src.core import assets
+from src.core.certificate_renderer import render_certificate_pdf
+
+SAMPLE_RECORD = {
+    "student_name": "Ana Silva",
+    "course_name": "Kubernetes Fundamentals",
+    "issue_date": "2025-03-01",
+    "instructor": "Bruno Costa",
+    "instructor_title": "Lead Instructor",
+    "co_instructor": "Carla Souza",
+    "co_instructor_title": "Teaching Assistant",
+    "organization": "TestCraft",
+    "place": "Porto Alegre",
+    "certification_type": "CKA Prep",
+    "hours": "40",
+}
+
+
+def _timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(repeat=200, renders=20):
+    results = {"cold_load_ms": {}, "warm_lookup_us": {}}
+
+    for name in list(assets._loaders):
+        start = time.perf_counter()
+        assets.get_asset(name)
+        results["cold_load_ms"][name] = (time.perf_counter() - start) * 1000
+
+    for name in list(assets._loaders):
+        results["warm_lookup_us"][name] = _timed(lambda: assets.get_asset(name), repeat) * 1e6
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["warm_render_ms"] = _timed(lambda: render_certificate_pdf(SAMPLE_RECORD), renders) * 1000
+
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
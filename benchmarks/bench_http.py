@@ -0,0 +1,160 @@
+"""Measure end-to-end latency of the main routes through the ASGI app in-process.
+
+Requests are handed straight to ``app`` (no sockets), one at a time, so
+the numbers are the service's own latency: routing, validation, storage,
+rendering and serialization. The database is a throwaway copy seeded with
+synthetic certificates.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_http
+    python -m benchmarks.bench_http --records 10000 --requests 500 --backend sqlite
+"""
+import os
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+from urllib.parse import urlencode
+
+from benchmarks.bench_records import synthetic_records
+from benchmarks.timing import summarize
+
+ADMIN_TOKEN = "bench-token"
+
+
+async def asgi_request(app, method, path, params=None, body=None, headers=()):
+    """Send one HTTP request to an ASGI app and return ``(status, body)``."""
+    payload = json.dumps(body).encode() if body is not None else b""
+    request_headers = [(b"host", b"bench"), (b"content-length", str(len(payload)).encode())]
+    if body is not None:
+        request_headers.append((b"content-type", b"application/json"))
+    request_headers.extend((name.encode(), value.encode()) for name, value in headers)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": urlencode(params or {}).encode(),
+        "headers": request_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    delivered = False
+
+    async def receive():
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        # The client never disconnects; streaming responses stop waiting
+        # for it once they are done.
+        await asyncio.get_running_loop().create_future()
+
+    status = None
+    chunks = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+async def _timed_requests(app, requests):
+    samples = []
+    errors = 0
+    for method, path, params, body, headers in requests:
+        start = time.perf_counter()
+        status, _ = await asgi_request(app, method, path, params, body, headers)
+        samples.append(time.perf_counter() - start)
+        if status >= 400:
+            errors += 1
+    result = summarize(samples)
+    result["errors"] = errors
+    return result
+
+
+def _certificate_request(number):
+    return {
+        "student_name": f"Bench Student {number}",
+        "course_name": "Kubernetes Fundamentals",
+        "issue_date": "2025-03-01",
+        "instructor": "Bruno Costa",
+        "instructor_title": "Lead Instructor",
+        "co_instructor": "Carla Souza",
+        "co_instructor_title": "Teaching Assistant",
+        "organization": "TestCraft",
+        "place": "Porto Alegre",
+        "certification_type": "CKA Prep",
+        "hours": "40",
+    }
+
+
+async def _run(records, requests, backend):
+    # The service reads its configuration at import time.
+    directory = tempfile.mkdtemp(prefix="cert-bench-http-")
+    os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+    os.environ["CERT_DB_PATH"] = os.path.join(directory, "certificates_db.json")
+    os.environ["CERT_JOBS_DB_PATH"] = os.path.join(directory, "jobs.sqlite3")
+    os.environ["CERT_DB_BACKEND"] = backend
+    os.environ["CERT_VALIDATE_RATE"] = "0"
+    os.environ["CERT_VALIDATE_BATCH_RATE"] = "0"
+    from src.api.certificate_service import app
+    from src.core.certificate_renderer import CertificateDB
+
+    db = CertificateDB()
+    seeded = list(synthetic_records(records))
+    db.save_certificates(seeded)
+
+    rng = random.Random(records)
+    picks = [rng.choice(seeded) for _ in range(requests)]
+    distinct = rng.sample(seeded, min(requests, len(seeded)))
+    admin = (("x-admin-token", ADMIN_TOKEN),)
+
+    def lookup(path, record):
+        params = {"certificate_id": record["id"], "verification_code": record["verification_code"]}
+        return ("GET", path, params, None, ())
+
+    await app.router.startup()
+    try:
+        # One untimed request per route to import and warm everything it touches.
+        for path in ("/api/validate", "/view"):
+            await asgi_request(app, *lookup(path, seeded[0])[:3])
+        return {
+            "records": records,
+            "backend": backend,
+            "validate": await _timed_requests(app, [lookup("/api/validate", record) for record in picks]),
+            "view": await _timed_requests(app, [lookup("/view", record) for record in distinct]),
+            "view_cached": await _timed_requests(app, [lookup("/view", seeded[0]) for _ in range(requests)]),
+            "generate": await _timed_requests(app, [
+                ("POST", "/api/generate", None, _certificate_request(number), admin) for number in range(requests)
+            ]),
+        }
+    finally:
+        await app.router.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run(records=1000, requests=200, backend="sqlite"):
+    return asyncio.run(_run(records, requests, backend))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000, help="Synthetic certificates to seed")
+    parser.add_argument("--requests", type=int, default=200, help="Requests timed per route")
+    parser.add_argument("--backend", default="sqlite", help="Storage backend for the seeded database")
+    args = parser.parse_args()
+    print(json.dumps(run(args.records, args.requests, args.backend), indent=2))
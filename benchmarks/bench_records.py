@@ -0,0 +1,95 @@
+"""Measure the memory held per certificate as a dict and as a CertificateRecord.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_records
+    python -m benchmarks.bench_records --count 100000
+"""
+import gc
+import sys
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from src.core.records import CertificateRecord
+
+COURSES = [f"Kubernetes Course {number}" for number in range(40)]
+INSTRUCTORS = [(f"Instructor {number}", "Lead Instructor") for number in range(25)]
+ORGANIZATIONS = ["TestCraft", "CNCF Chapter", "Cloud Academy", "K8s Brasil"]
+PLACES = ["Porto Alegre", "São Paulo", "Online", "Lisbon", "Recife"]
+TYPES = ["CKA Prep", "CKAD Prep", "Workshop"]
+
+
+def synthetic_records(count, seed=1, start_number=0):
+    """Yield records shaped like the ones issued by the service."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    for number in range(start_number, start_number + count):
+        instructor, instructor_title = rng.choice(INSTRUCTORS)
+        co_instructor, co_instructor_title = rng.choice(INSTRUCTORS)
+        yield {
+            "id": f"KC-2025{number % 12 + 1:02d}-{number:06X}-{rng.getrandbits(16):04X}",
+            "verification_code": "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ234567") for _ in range(12)),
+            "student_name": f"Student {number}",
+            "course_name": rng.choice(COURSES),
+            "issue_date": (start + timedelta(days=rng.randrange(365))).strftime("%Y-%m-%d"),
+            "timestamp": (start + timedelta(seconds=number)).isoformat(),
+            "instructor": instructor,
+            "instructor_title": instructor_title,
+            "co_instructor": co_instructor,
+            "co_instructor_title": co_instructor_title,
+            "organization": rng.choice(ORGANIZATIONS),
+            "place": rng.choice(PLACES),
+            "certification_type": rng.choice(TYPES),
+            "hours": str(rng.choice((8, 16, 24, 40))),
+        }
+
+
+def stored_lines(count, seed=1):
+    """Yield the records of ``synthetic_records`` as stored JSON lines."""
+    for record in synthetic_records(count, seed):
+        yield json.dumps(record)
+
+
+def _deep_size(objects):
+    """Bytes held by ``objects``, counting shared objects once."""
+    seen = set()
+    total = 0
+    for obj in objects:
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            children = [item for pair in obj.items() for item in pair]
+        else:
+            children = [getattr(obj, name) for name in obj.__slots__]
+        for child in children:
+            if child is not None and id(child) not in seen:
+                seen.add(id(child))
+                total += sys.getsizeof(child)
+    return total
+
+
+def _measure(count, load):
+    held = [load(json.loads(line)) for line in stored_lines(count)]
+    per_record = _deep_size(held) / count
+    del held
+    gc.collect()
+    return per_record
+
+
+def run(count=1000000):
+    as_dict = _measure(count, lambda data: data)
+    as_record = _measure(count, CertificateRecord.from_dict)
+    return {
+        "records": count,
+        "dict_bytes_per_record": round(as_dict, 1),
+        "certificate_record_bytes_per_record": round(as_record, 1),
+        "ratio": round(as_dict / as_record, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count), indent=2))
@@ -0,0 +1,60 @@
+"""Measure single-certificate render latency and renders per second per core.
+
+Rendering runs in this process on one core, with and without the
+co-instructor signature block. Run from the repository root:
+
+    python -m benchmarks.bench_render
+    python -m benchmarks.bench_render --repeat 500
+"""
+import io
+import time
+import json
+import argparse
+
+from benchmarks.timing import sample, summarize
+from src.core.certificate_renderer import generate_certificate
+
+SAMPLE_FIELDS = {
+    "student_name": "Ana Silva",
+    "course_name": "Kubernetes Fundamentals",
+    "issue_date": "2025-03-01",
+    "instructor": "Bruno Costa",
+    "instructor_title": "Lead Instructor",
+    "co_instructor": "Carla Souza",
+    "co_instructor_title": "Teaching Assistant",
+    "organization": "TestCraft",
+    "place": "Porto Alegre",
+    "certification_type": "CKA Prep",
+    "hours": "40",
+}
+
+
+def _render(fields):
+    return generate_certificate(output_path=io.BytesIO(), **fields)
+
+
+def _case(fields, repeat):
+    start = time.perf_counter()
+    _render(fields)
+    cold = time.perf_counter() - start
+    samples = sample(lambda: _render(fields), repeat, warmup=5)
+    result = summarize(samples)
+    result["first_render_ms"] = round(cold * 1000, 4)
+    result["renders_per_sec_per_core"] = round(len(samples) / sum(samples), 2)
+    return result
+
+
+def run(repeat=200):
+    without_co_instructor = dict(SAMPLE_FIELDS, co_instructor="", co_instructor_title="")
+    return {
+        # Runs first so that it pays for loading the template and assets.
+        "with_co_instructor": _case(SAMPLE_FIELDS, repeat),
+        "without_co_instructor": _case(without_co_instructor, repeat),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat), indent=2))
@@ -0,0 +1,156 @@
+"""Measure import time, startup-to-ready time and memory of the API server.
+
+Every measurement runs in a fresh interpreter, since what is being
+measured is the cost of starting from nothing:
+
+- ``import``: time to import the app and, separately, the rendering stack
+  (ReportLab and Pillow), with the number of modules loaded and peak RSS
+- ``startup``: time from launching ``start_api_server`` until ``/readyz``
+  answers 200, and the server's RSS at that point, for the full and the
+  validate-only server mode
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 20 --starts 10
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import subprocess
+import urllib.error
+import urllib.request
+
+from benchmarks.timing import summarize
+
+ADMIN_TOKEN = "bench-admin-token"
+MODES = ("full", "validate")
+
+IMPORT_TARGETS = {
+    "app": ["src.api.api"],
+    "rendering_stack": ["reportlab.pdfgen.canvas", "reportlab.pdfbase.ttfonts", "reportlab.lib.utils", "PIL.Image"],
+}
+
+_IMPORT_SCRIPT = """
+import sys, json, time, importlib, resource
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "modules": len(sys.modules),
+    "rendering_stack": any(name.split(".")[0] in ("reportlab", "PIL") for name in sys.modules),
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+"""
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _server_env(directory, mode, render_workers):
+    return dict(
+        os.environ,
+        ADMIN_TOKEN=ADMIN_TOKEN,
+        CERT_SERVER_MODE=mode,
+        CERT_DB_PATH=os.path.join(directory, "certificates_db.json"),
+        CERT_JOBS_DB_PATH=os.path.join(directory, "jobs.sqlite3"),
+        CERT_RENDER_WORKERS=str(render_workers),
+    )
+
+
+def measure_import(modules, repeat, env):
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SCRIPT] + modules,
+            env=env, stdout=subprocess.PIPE, check=True, text=True
+        )
+        runs.append(json.loads(completed.stdout))
+    result = summarize([run["seconds"] for run in runs])
+    result["modules"] = runs[-1]["modules"]
+    result["rendering_stack_loaded"] = runs[-1]["rendering_stack"]
+    # ru_maxrss is in kilobytes on Linux.
+    result["max_rss_bytes"] = max(run["max_rss_kb"] for run in runs) * 1024
+    return result
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def start_until_ready(env, timeout=60):
+    """Launch a server and return ``(seconds until /readyz is 200, its RSS then)``."""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-c",
+         f"from src.api.api import start_api_server; start_api_server(host='127.0.0.1', port={port})"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError("The server exited during startup")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started, _rss_bytes(server.pid)
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.01)
+        raise RuntimeError("The server did not become ready in time")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def run(repeat=10, starts=5, render_workers=1):
+    directory = tempfile.mkdtemp(prefix="cert-bench-startup-")
+    try:
+        results = {"import": {}, "startup": {}}
+        env = _server_env(directory, "full", render_workers)
+        for name, modules in IMPORT_TARGETS.items():
+            results["import"][name] = measure_import(modules, repeat, env)
+
+        for mode in MODES:
+            env = _server_env(directory, mode, render_workers)
+            samples, rss = [], []
+            for _ in range(starts):
+                seconds, rss_bytes = start_until_ready(env)
+                samples.append(seconds)
+                if rss_bytes is not None:
+                    rss.append(rss_bytes)
+            result = summarize(samples)
+            if rss:
+                result["rss_bytes"] = max(rss)
+            results["startup"][mode] = result
+        results["startup"]["render_workers"] = render_workers
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="Fresh interpreters per import measurement")
+    parser.add_argument("--starts", type=int, default=5, help="Server starts per mode")
+    parser.add_argument("--render-workers", type=int, default=1, help="CERT_RENDER_WORKERS for the full server")
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat, args.starts, args.render_workers), indent=2))
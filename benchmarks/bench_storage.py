@@ -0,0 +1,146 @@
+"""Measure CertificateDB lookup and save latency as the database grows.
+
+Each backend is seeded with synthetic certificates in a temporary
+directory, then timed through ``CertificateDB`` as the service uses it:
+
+- ``get``: first lookup of stored ids, served from storage
+- ``get_cached``: the same ids again, served from the record cache
+- ``get_unknown``: ids that were never issued
+- ``save``: inserting one new certificate
+
+Run from the repository root:
+
+    python -m benchmarks.bench_storage
+    python -m benchmarks.bench_storage --sizes 1000,10000 --backends sqlite,log
+"""
+import os
+import time
+import json
+import random
+import shutil
+import argparse
+import itertools
+import tempfile
+
+from benchmarks.bench_records import synthetic_records
+from benchmarks.timing import sample, summarize
+from src.core.certificate_renderer import CertificateDB, get_id_filter_stats
+from src.core.storage import BACKENDS, open_storage
+from src.core.validation_snapshot import export_snapshot
+
+SIZES = (1000, 10000, 100000, 1000000)
+
+# Every JSON lookup parses the whole file and every save rewrites it, so
+# it is timed on fewer samples as it grows, and not at all past this size.
+JSON_MAX_RECORDS = 100000
+JSON_SAMPLE_BUDGET = 1000000
+
+PATHS = {
+    "json": "certificates.json",
+    "sqlite": "certificates.sqlite3",
+    "log": "certificates",
+    "snapshot": "certificates.snapshot",
+}
+
+
+def _tap(records, wanted, found):
+    """Pass ``records`` through, keeping the ids of those whose position is in ``wanted``."""
+    for number, record in enumerate(records):
+        if number in wanted:
+            found[number] = record["id"]
+        yield record
+
+
+def _seed(backend, path, size, wanted, chunk=10000):
+    """Fill a new database with ``size`` records; return the ids at positions ``wanted``."""
+    found = {}
+    records = _tap(synthetic_records(size), set(wanted), found)
+    _fill(backend, path, records, chunk)
+    return [found[number] for number in wanted]
+
+
+def _fill(backend, path, records, chunk):
+    if backend == "snapshot":
+        export_snapshot(records, path)
+        return
+    storage = open_storage(path, backend)
+    if backend == "json":
+        storage.put_many(list(records))
+        return
+    while True:
+        batch = list(itertools.islice(records, chunk))
+        if not batch:
+            return
+        storage.put_many(batch)
+
+
+def _wait_for_id_filter(db, timeout=120):
+    """Let the Bloom filter finish building so lookups aren't timed while it is stale."""
+    stats = get_id_filter_stats()
+    if stats is None or db.id_filter is None:
+        return
+    rebuilds = stats["rebuilds"]
+    deadline = time.monotonic() + timeout
+    while get_id_filter_stats()["rebuilds"] == rebuilds and time.monotonic() < deadline:
+        db.get_certificate("KC-000000-000000-0000")
+        time.sleep(0.05)
+
+
+def _case(backend, size, gets, saves, directory):
+    if backend == "json":
+        gets = max(5, min(gets, JSON_SAMPLE_BUDGET // size))
+        saves = max(5, min(saves, JSON_SAMPLE_BUDGET // size))
+    path = os.path.join(directory, PATHS[backend])
+    wanted = random.Random(size).sample(range(size), min(gets, size))
+    start = time.perf_counter()
+    ids = _seed(backend, path, size, wanted)
+    seed_seconds = time.perf_counter() - start
+
+    db = CertificateDB(path, backend)
+    _wait_for_id_filter(db)
+
+    unknown = [f"KC-209901-{number:06X}-0000" for number in range(len(ids))]
+
+    lookups = iter(ids)
+    result = {
+        "seed_seconds": round(seed_seconds, 3),
+        "get": summarize(sample(lambda: db.get_certificate(next(lookups)), len(ids))),
+    }
+    lookups = iter(ids)
+    result["get_cached"] = summarize(sample(lambda: db.get_certificate(next(lookups)), len(ids)))
+    lookups = iter(unknown)
+    result["get_unknown"] = summarize(sample(lambda: db.get_certificate(next(lookups)), len(unknown)))
+
+    if backend != "snapshot":
+        new_records = synthetic_records(saves, seed=size + 1, start_number=size)
+        result["save"] = summarize(sample(lambda: db.save_certificate(next(new_records)), saves))
+
+    result["size_bytes"] = db.storage.size_bytes()
+    return result
+
+
+def run(sizes=SIZES, backends=BACKENDS, gets=1000, saves=100):
+    results = {}
+    for backend in backends:
+        results[backend] = {}
+        for size in sizes:
+            if backend == "json" and size > JSON_MAX_RECORDS:
+                results[backend][str(size)] = {"skipped": f"json backend is limited to {JSON_MAX_RECORDS} records"}
+                continue
+            directory = tempfile.mkdtemp(prefix="cert-bench-storage-")
+            try:
+                results[backend][str(size)] = _case(backend, size, gets, saves, directory)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="Comma-separated record counts")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated storage backends")
+    parser.add_argument("--gets", type=int, default=1000, help="Lookups timed per case")
+    parser.add_argument("--saves", type=int, default=100, help="Inserts timed per case")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    print(json.dumps(run(sizes, args.backends.split(","), args.gets, args.saves), indent=2))
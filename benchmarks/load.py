@@ -0,0 +1,262 @@
+"""Drive a mix of validate, view, download and generate traffic at a local server.
+
+A server is started with ``start_api_server`` on a free port, over a
+throwaway database seeded with synthetic certificates. Requests are then
+sent open-loop: each is scheduled at its slot for the target rate and
+sent whether or not earlier ones have finished, so a server that stalls
+builds up a backlog instead of quietly slowing the load down. Latency is
+measured from a request's scheduled time, which counts that backlog.
+
+Needs httpx (``pip install httpx``). Run from the repository root:
+
+    python -m benchmarks.load
+    python -m benchmarks.load --rps 200 --duration 60 --records 10000
+    python -m benchmarks.load --mix validate=90,view=10 --output load.json
+"""
+import os
+import sys
+import json
+import time
+import bisect
+import random
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.bench_http import ADMIN_TOKEN, _certificate_request
+from benchmarks.bench_records import synthetic_records
+from benchmarks.timing import summarize
+from src.core.metrics import DEFAULT_BUCKETS
+
+ROUTES = ("validate", "view", "download", "generate")
+DEFAULT_MIX = "validate=70,view=15,download=10,generate=5"
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        route, _, weight = part.partition("=")
+        if route not in ROUTES:
+            raise ValueError(f"Unknown route {route!r}; expected one of {', '.join(ROUTES)}")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(db_file, backend, records):
+    """Write ``records`` synthetic certificates and return them."""
+    from src.core.certificate_renderer import CertificateDB
+    seeded = list(synthetic_records(records))
+    CertificateDB(db_file, backend).save_certificates(seeded)
+    return seeded
+
+
+def start_server(directory, port, backend, workers, rate_limit):
+    env = dict(
+        os.environ,
+        ADMIN_TOKEN=ADMIN_TOKEN,
+        CERT_DB_PATH=os.path.join(directory, "certificates_db.json"),
+        CERT_JOBS_DB_PATH=os.path.join(directory, "jobs.sqlite3"),
+        CERT_DB_BACKEND=backend,
+    )
+    if workers is not None:
+        env["CERT_RENDER_WORKERS"] = str(workers)
+    if not rate_limit:
+        env["CERT_VALIDATE_RATE"] = "0"
+        env["CERT_VALIDATE_BATCH_RATE"] = "0"
+    log = open(os.path.join(directory, "server.log"), "w")
+    return subprocess.Popen(
+        [sys.executable, "-c",
+         f"from src.api.api import start_api_server; start_api_server(host='127.0.0.1', port={port})"],
+        env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+async def wait_until_ready(client, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("The server exited during startup")
+        try:
+            await client.get("/api/")
+            return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("The server did not start in time")
+
+
+class RouteStats:
+    def __init__(self):
+        self.samples = []
+        self.statuses = {}
+        self.failures = 0
+
+    def record(self, latency, status):
+        self.samples.append(latency)
+        key = str(status) if status is not None else "error"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.failures += 1
+
+    def result(self, elapsed):
+        result = summarize(self.samples)
+        result["throughput_per_sec"] = round(len(self.samples) / elapsed, 2) if elapsed else 0.0
+        result["error_rate"] = round(self.failures / len(self.samples), 4) if self.samples else 0.0
+        result["statuses"] = self.statuses
+        # Cumulative, like the server's own /metrics histograms.
+        samples = sorted(self.samples)
+        result["histogram"] = {
+            f"le_{bound * 1000:g}ms": bisect.bisect_right(samples, bound) for bound in DEFAULT_BUCKETS
+        }
+        result["histogram"]["le_inf"] = len(samples)
+        return result
+
+
+def _build_request(route, seeded, rng, counter):
+    if route == "generate":
+        counter[0] += 1
+        return "POST", "/api/generate", None, _certificate_request(f"load-{counter[0]}")
+    record = rng.choice(seeded)
+    params = {"certificate_id": record["id"], "verification_code": record["verification_code"]}
+    path = {"validate": "/api/validate", "view": "/view", "download": "/download"}[route]
+    return "GET", path, params, None
+
+
+async def generate_load(client, seeded, mix, rps, duration, warmup, max_in_flight, seed_value=1):
+    rng = random.Random(seed_value)
+    routes = list(mix)
+    weights = [mix[route] for route in routes]
+    stats = {route: RouteStats() for route in routes}
+    slots = asyncio.Semaphore(max_in_flight)
+    counter = [0]
+    dropped = 0
+    tasks = set()
+
+    async def send(route, request, scheduled, measured):
+        method, path, params, body = request
+        status = None
+        try:
+            async with slots:
+                headers = {"X-Admin-Token": ADMIN_TOKEN} if method == "POST" else None
+                response = await client.request(method, path, params=params, json=body, headers=headers)
+                await response.aread()
+                status = response.status_code
+        except Exception:
+            pass
+        if measured:
+            stats[route].record(time.perf_counter() - scheduled, status)
+
+    start = time.perf_counter()
+    measure_from = start + warmup
+    total = int((warmup + duration) * rps)
+    for number in range(total):
+        scheduled = start + number / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(tasks) >= max_in_flight * 10:
+            # The server is this far behind; stop queueing and count the loss.
+            dropped += 1
+            continue
+        route = rng.choices(routes, weights)[0]
+        task = asyncio.ensure_future(send(route, _build_request(route, seeded, rng, counter), scheduled, scheduled >= measure_from))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - measure_from
+
+    completed = sum(len(route_stats.samples) for route_stats in stats.values())
+    return {
+        "target_rps": rps,
+        "achieved_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+        "duration_seconds": round(elapsed, 2),
+        "requests": completed,
+        "dropped": dropped,
+        "routes": {route: route_stats.result(elapsed) for route, route_stats in stats.items()},
+    }
+
+
+async def _run(args):
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("The load generator needs httpx: pip install httpx")
+
+    mix = parse_mix(args.mix)
+    directory = tempfile.mkdtemp(prefix="cert-load-")
+    port = _free_port()
+    print(f"Seeding {args.records} certificates...", file=sys.stderr)
+    seeded = seed(os.path.join(directory, "certificates_db.json"), args.backend, args.records)
+    server = start_server(directory, port, args.backend, args.workers, args.rate_limit)
+    try:
+        limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+        timeout = httpx.Timeout(args.timeout)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=timeout) as client:
+            await wait_until_ready(client, server)
+            print(f"Sending {args.rps} requests/s for {args.duration}s...", file=sys.stderr)
+            result = await generate_load(
+                client, seeded, mix, args.rps, args.duration, args.warmup, args.max_in_flight
+            )
+        result.update({"records": args.records, "backend": args.backend, "mix": mix})
+        return result
+    except RuntimeError:
+        with open(os.path.join(directory, "server.log")) as f:
+            sys.stderr.write(f.read())
+        raise
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def print_report(result, out=sys.stderr):
+    print(
+        f"{result['requests']} requests in {result['duration_seconds']}s: "
+        f"{result['achieved_rps']}/s achieved of {result['target_rps']}/s, {result['dropped']} dropped",
+        file=out
+    )
+    print(f"{'route':<10} {'count':>7} {'rps':>8} {'errors':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}", file=out)
+    for route, stats in result["routes"].items():
+        if not stats["count"]:
+            continue
+        print(
+            f"{route:<10} {stats['count']:>7} {stats['throughput_per_sec']:>8} {stats['error_rate']:>7.2%} "
+            f"{stats['p50_ms']:>9.1f} {stats['p90_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}",
+            file=out
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rps", type=float, default=50, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds of unmeasured load first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Route weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--records", type=int, default=1000, help="Synthetic certificates to seed")
+    parser.add_argument("--backend", default="sqlite", help="Storage backend of the seeded database")
+    parser.add_argument("--workers", type=int, default=None, help="Server render workers (default: one per CPU)")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Open connections to the server")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--rate-limit", action="store_true", help="Keep the per-client validation rate limit")
+    parser.add_argument("--output", "-o", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(_run(args))
+    print_report(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
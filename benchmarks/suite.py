@@ -0,0 +1,163 @@
+"""Run the benchmarks and compare the results with a saved baseline.
+
+Every benchmark runs in its own process, so caches, imported modules and
+configuration read at import time don't leak from one into the next.
+Results are written as JSON together with the commit and machine they
+were taken on.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --baseline baseline.json --output current.json
+    python -m benchmarks.suite --quick --only render,http
+
+With ``--baseline`` every timing, size and throughput is compared with
+the baseline; changes for the worse beyond ``--threshold`` percent are
+reported as regressions, and ``--fail-on-regression`` makes them fail
+the run.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+
+BENCHMARKS = {
+    "render": ("benchmarks.bench_render", [], ["--repeat", "50"]),
+    "storage": ("benchmarks.bench_storage", [], ["--sizes", "1000,10000", "--gets", "200", "--saves", "20"]),
+    "http": ("benchmarks.bench_http", [], ["--requests", "50"]),
+    "assets": ("benchmarks.bench_assets", [], []),
+    "records": ("benchmarks.bench_records", ["--count", "100000"], ["--count", "10000"]),
+    "startup": ("benchmarks.bench_startup", [], ["--repeat", "3", "--starts", "2"]),
+}
+
+LOWER_IS_BETTER = ("_ms", "_us", "_seconds", "_bytes", "_bytes_per_record")
+HIGHER_IS_BETTER = ("_per_sec", "_per_sec_per_core", "ratio")
+# A single slowest sample is too noisy to compare between runs.
+IGNORED = ("max_ms",)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(name, quick=False):
+    module, arguments, quick_arguments = BENCHMARKS[name]
+    completed = subprocess.run(
+        [sys.executable, "-m", module] + (quick_arguments if quick else arguments),
+        stdout=subprocess.PIPE, check=True, text=True
+    )
+    return json.loads(completed.stdout)
+
+
+def run(names=tuple(BENCHMARKS), quick=False):
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": quick,
+        },
+        "benchmarks": {},
+    }
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        start = time.perf_counter()
+        results["benchmarks"][name] = run_benchmark(name, quick)
+        print(f"  done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return results
+
+
+def _flatten(data, prefix=""):
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from _flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def _direction(path):
+    key = path.rsplit(".", 1)[-1]
+    if key in IGNORED:
+        return 0
+    if key.endswith(HIGHER_IS_BETTER):
+        return 1
+    if key.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(current, baseline, threshold=10.0):
+    """Changes between two result files as ``(metric, baseline, current, percent, status)``."""
+    before = dict(_flatten(baseline["benchmarks"]))
+    changes = []
+    for path, value in _flatten(current["benchmarks"]):
+        direction = _direction(path)
+        previous = before.get(path)
+        if not direction or not previous:
+            continue
+        percent = (value - previous) / previous * 100
+        if percent * direction < -threshold:
+            status = "regression"
+        elif percent * direction > threshold:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        changes.append((path, previous, value, round(percent, 1), status))
+    return changes
+
+
+def print_comparison(changes, out=sys.stderr):
+    width = max((len(path) for path, *_ in changes), default=0)
+    for path, previous, value, percent, status in changes:
+        if status != "unchanged":
+            print(f"{path:<{width}}  {previous:>12g} -> {value:<12g} {percent:+7.1f}%  {status}", file=out)
+    regressions = sum(1 for change in changes if change[4] == "regression")
+    improvements = sum(1 for change in changes if change[4] == "improvement")
+    print(f"{len(changes)} metrics compared: {regressions} regressions, {improvements} improvements", file=out)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", help=f"Comma-separated benchmarks to run (default: {','.join(BENCHMARKS)})")
+    parser.add_argument("--quick", action="store_true", help="Small sizes and sample counts, for a fast check")
+    parser.add_argument("--output", "-o", help="Write the results to this JSON file (default: stdout)")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on any regression")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    results = run(names, args.quick)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = print_comparison(compare(results, baseline, args.threshold))
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
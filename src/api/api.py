@@ -1,7 +1,10 @@
 from src.api.certificate_service import app
+from src.core.logs import configure_logging
 
 import uvicorn
 
+configure_logging()
+
 
 def start_api_server(host="0.0.0.0", port=8050):
     uvicorn.run("src.api.api:app", host=host, port=port, reload=False)
@@ -1,20 +1,64 @@
 import os
+import json
+import math
+import asyncio
+import tempfile
 from pathlib import Path
-from fastapi import FastAPI, HTTPException, Query, Depends, Request
+from typing import List, Literal
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, RedirectResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import APIKeyHeader
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from starlette.background import BackgroundTask
 
+from src.core.assets import assets_loaded, preload_assets
 from src.core.certificate_renderer import (
     validate_certificate,
-    generate_certificate,
-    save_certificate_data,
+    validate_certificates,
+    issue_certificate_record,
+    issuance_status,
+    conflict_message,
+    get_cached_pdf,
+    cache_pdf,
+    certificate_content_hash,
     generate_secure_certificate_id,
     generate_verification_code,
+    get_cache_stats,
+    get_id_filter_stats,
+    get_pdf_cache_stats,
+    CertificateDB,
     CERT_DB_FILE
 )
+from src.core.jobs import JobQueue, JobRunner
+from src.core.profiler import profiler
+from src.core.request_timer import phase
+from src.core.templates import template_exists
+from src.core.storage import StorageError
+from src.core.render_pool import render_pool, RenderPoolSaturated, CERT_RENDER_RETRY_AFTER
+from src.api.health import liveness, readiness, register_check
+from src.api.metrics import RequestMetricsMiddleware, metrics_endpoint
+from src.api.server_timing import ServerTimingMiddleware
+from src.api.rate_limit import TokenBucketLimiter, client_address, parse_networks
+
+
+PDF_CACHE_CONTROL = os.environ.get("CERT_PDF_CACHE_CONTROL", "public, max-age=86400")
+GENERATE_BATCH_MAX = int(os.environ.get("CERT_GENERATE_BATCH_MAX", "1000"))
+VALIDATE_BATCH_MAX = int(os.environ.get("CERT_VALIDATE_BATCH_MAX", "500"))
+COHORT_MAX = int(os.environ.get("CERT_COHORT_MAX", "1000"))
+JOB_WORKERS = int(os.environ.get("CERT_JOB_WORKERS", "2"))
+VALIDATE_RATE = float(os.environ.get("CERT_VALIDATE_RATE", "10"))
+VALIDATE_BURST = float(os.environ.get("CERT_VALIDATE_BURST", "50"))
+VALIDATE_BATCH_RATE = float(os.environ.get("CERT_VALIDATE_BATCH_RATE", "100"))
+TRUSTED_PROXIES = parse_networks(os.environ.get("CERT_TRUSTED_PROXIES", ""))
+SERVER_MODE = os.environ.get("CERT_SERVER_MODE", "full")
+JOBS_DB_FILE = os.environ.get(
+    "CERT_JOBS_DB_PATH",
+    os.path.join(os.path.dirname(CERT_DB_FILE) or ".", "jobs.sqlite3")
+)
 
 
 class ValidationRequest(BaseModel):
@@ -40,19 +84,37 @@ class CertificateRequest(BaseModel):
     place: str
     certification_type: str
     hours: str
+    template: str = ""
+
+    @field_validator("template")
+    @classmethod
+    def check_template(cls, template):
+        if template and not template_exists(template):
+            raise ValueError(f"Unknown certificate template: {template}")
+        return template
+
+
+class CohortRequest(BaseModel):
+    certificate_ids: List[str]
+    filename: str = "certificates.pdf"
+
+
+class ProfilerSettings(BaseModel):
+    percent: float = Field(ge=0, le=100)
 
 
 class CertificateResponse(BaseModel):
     certificate_id: str
     verification_code: str
+    already_issued: bool = False
 
 
-def validate_and_respond(certificate_id, verification_code):
-    if not os.path.exists(CERT_DB_FILE):
+def require_database():
+    if not CertificateDB().exists():
         raise HTTPException(status_code=503, detail="Certificate database not available")
 
-    is_valid, cert_data = validate_certificate(certificate_id, verification_code)
 
+def validation_response(is_valid, cert_data):
     if is_valid:
         return ValidationResponse(
             valid=True,
@@ -68,7 +130,8 @@ def validate_and_respond(certificate_id, verification_code):
                 "organization": cert_data.get("organization", ""),
                 "place": cert_data.get("place", ""),
                 "certification_type": cert_data.get("certification_type", ""),
-                "hours": cert_data.get("hours", "")
+                "hours": cert_data.get("hours", ""),
+                "template": cert_data.get("template", "")
             }
         )
     elif cert_data:
@@ -83,26 +146,95 @@ def validate_and_respond(certificate_id, verification_code):
         )
 
 
-def generate_certificate_pdf(cert_data):
+validate_limiter = TokenBucketLimiter(VALIDATE_RATE, VALIDATE_BURST)
+# Batches spend pairs from a bucket of their own that holds a full batch.
+validate_batch_limiter = TokenBucketLimiter(VALIDATE_BATCH_RATE, VALIDATE_BATCH_MAX)
+
+
+def enforce_validate_rate(request, cost=1, limiter=validate_limiter):
+    wait = limiter.take(client_address(request, TRUSTED_PROXIES), cost)
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many validation requests",
+            headers={"Retry-After": str(math.ceil(wait))}
+        )
+
+
+def limit_validation(request: Request):
+    enforce_validate_rate(request)
+
+
+def validate_and_respond(certificate_id, verification_code):
+    require_database()
+    with phase("validate"):
+        is_valid, record = validate_certificate(certificate_id, verification_code)
+    return validation_response(is_valid, record.to_dict() if record else None)
+
+
+def validate_many_and_respond(requests):
+    require_database()
+    with phase("validate"):
+        results = validate_certificates([(r.certificate_id, r.verification_code) for r in requests])
+    return [
+        validation_response(is_valid, record.to_dict() if record else None)
+        for is_valid, record in results
+    ]
+
+
+async def generate_certificate_pdf(cert_data, block=False):
+    pdf_bytes = get_cached_pdf(cert_data)
+    if pdf_bytes is not None:
+        return pdf_bytes
+
     try:
-        pdf_path = generate_certificate(
-            cert_data["student_name"],
-            cert_data["course_name"],
-            cert_data["issue_date"],
-            cert_data.get("instructor", ""),
-            cert_data.get("instructor_title", ""),
-            cert_data.get("co_instructor", ""),
-            cert_data.get("co_instructor_title", ""),
-            cert_data.get("organization", ""),
-            cert_data.get("place", ""),
-            cert_data.get("certification_type", ""),
-            cert_data.get("hours", ""),
-            cert_data["id"]
+        with phase("render"):
+            pdf_bytes = await render_pool.render(cert_data, block=block)
+    except RenderPoolSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Certificate renderer is busy, retry later",
+            headers={"Retry-After": str(CERT_RENDER_RETRY_AFTER)}
         )
-        return pdf_path
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    cache_pdf(cert_data, pdf_bytes)
+    return pdf_bytes
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def pdf_response(request, cert_data, filename=None):
+    """Serve a certificate PDF, answering matching conditional requests with 304.
+
+    The ETag is derived from the record alone, so a 304 never renders or
+    loads the PDF.
+    """
+    etag = f'"{certificate_content_hash(cert_data)}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": PDF_CACHE_CONTROL,
+        "Content-Disposition": f'attachment; filename="{filename}"' if filename else "inline"
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(
+        content=await generate_certificate_pdf(cert_data),
+        media_type="application/pdf",
+        headers=headers
+    )
+
 
 api_app = FastAPI(
     title="Certificate Management API",
@@ -122,9 +254,23 @@ ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
 if not ADMIN_TOKEN:
     raise ValueError("ADMIN_TOKEN environment variable must be set")
 
+if SERVER_MODE not in ("full", "validate"):
+    raise ValueError(f"CERT_SERVER_MODE must be 'full' or 'validate', not {SERVER_MODE!r}")
+
+# Routes that render or issue certificates; a validate-only server leaves
+# them out and never loads the rendering stack.
+RENDER_ROUTES = {"/api/generate", "/api/generate/batch", "/api/cohort", "/api/jobs/{job_id}", "/view", "/download"}
+
 api_key_header = APIKeyHeader(name="X-Admin-Token")
 
 
+async def storage_error_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": "Certificate database not available"})
+
+
+api_app.add_exception_handler(StorageError, storage_error_handler)
+
+
 def verify_admin_token(api_key: str = Depends(api_key_header)):
     if api_key != ADMIN_TOKEN:
         raise HTTPException(
@@ -143,24 +289,73 @@ async def api_root():
     }
 
 
-@api_app.get("/validate")
-async def validate_get(
+@api_app.get("/stats")
+async def api_stats(request: Request, token: str = Depends(verify_admin_token)):
+    """Stats of the worker that answers; ``/metrics`` covers all of them."""
+    stats = {
+        "worker": os.getpid(),
+        "certificate_cache": get_cache_stats(),
+        "id_filter": get_id_filter_stats(),
+        "validate_rate_limit": validate_limiter.stats(),
+        "validate_batch_rate_limit": validate_batch_limiter.stats(),
+    }
+    if SERVER_MODE == "full":
+        stats["pdf_cache"] = get_pdf_cache_stats()
+        stats["render_pool"] = render_pool.stats()
+    if request.app.state.job_queue is not None:
+        stats["jobs"] = request.app.state.job_queue.counts()
+    return stats
+
+
+@api_app.get("/profiler")
+def get_profiler(token: str = Depends(verify_admin_token)):
+    return profiler.stats()
+
+
+@api_app.put("/profiler")
+def configure_profiler(settings: ProfilerSettings, token: str = Depends(verify_admin_token)):
+    """Profile ``percent`` of requests from now on; 0 turns the profiler off."""
+    profiler.configure(settings.percent / 100)
+    return profiler.stats()
+
+
+@api_app.get("/profiler/stacks", response_class=PlainTextResponse)
+def get_profiler_stacks(reset: bool = False, token: str = Depends(verify_admin_token)):
+    """Sampled stacks in collapsed format, ready for flamegraph.pl or speedscope."""
+    stacks = profiler.collapsed()
+    if reset:
+        profiler.reset()
+    return PlainTextResponse(stacks)
+
+
+@api_app.delete("/profiler/stacks")
+def reset_profiler_stacks(token: str = Depends(verify_admin_token)):
+    profiler.reset()
+    return profiler.stats()
+
+
+@api_app.get("/validate", dependencies=[Depends(limit_validation)])
+def validate_get(
     certificate_id: str = Query(..., description="Certificate ID to validate"),
     verification_code: str = Query(None, description="Optional verification code")
 ):
     return validate_and_respond(certificate_id, verification_code)
 
 
-@api_app.post("/validate")
-async def validate_post(request: ValidationRequest):
+@api_app.post("/validate", dependencies=[Depends(limit_validation)])
+def validate_post(request: ValidationRequest):
     return validate_and_respond(request.certificate_id, request.verification_code)
 
 
-@api_app.post("/generate", response_model=CertificateResponse)
-async def generate_certificate_endpoint(
-    request: CertificateRequest,
-    token: str = Depends(verify_admin_token)
-):
+@api_app.post("/validate/batch", response_model=List[ValidationResponse])
+def validate_batch(requests: List[ValidationRequest], http_request: Request):
+    if len(requests) > VALIDATE_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Batch larger than {VALIDATE_BATCH_MAX} items")
+    enforce_validate_rate(http_request, len(requests), validate_batch_limiter)
+    return validate_many_and_respond(requests)
+
+
+async def issue_certificate(request, block=False):
     cert_id = generate_secure_certificate_id(
         request.student_name,
         request.course_name,
@@ -173,40 +368,223 @@ async def generate_certificate_endpoint(
         request.course_name
     )
 
-    pdf_path = generate_certificate(
-        request.student_name,
-        request.course_name,
-        request.issue_date,
-        request.instructor,
-        request.instructor_title,
-        request.co_instructor,
-        request.co_instructor_title,
-        request.organization,
-        request.place,
-        request.certification_type,
-        request.hours,
-        cert_id
-    )
+    # IDs and codes are derived from the request, so a re-submission maps to
+    # the stored certificate and needs neither a render nor a write.
+    status, = await run_in_threadpool(issuance_status, [{"id": cert_id, **request.model_dump()}])
+    if status == "conflict":
+        raise HTTPException(status_code=409, detail=conflict_message(cert_id))
+    if status == "issued":
+        return CertificateResponse(
+            certificate_id=cert_id,
+            verification_code=verification_code,
+            already_issued=True
+        )
 
-    save_certificate_data(
-        cert_id,
-        verification_code,
-        request.student_name,
-        request.course_name,
-        request.issue_date,
-        request.instructor,
-        request.instructor_title,
-        request.co_instructor,
-        request.co_instructor_title,
-        request.organization,
-        request.place,
-        request.certification_type,
-        request.hours
-    )
+    await generate_certificate_pdf(request.model_dump(), block=block)
+
+    # Another request may have stored the same ID since the check above;
+    # the insert decides which one wins.
+    record = issue_certificate_record(request.model_dump())
+    status, = await run_in_threadpool(CertificateDB().insert_certificates, [record])
+    if status == "conflict":
+        raise HTTPException(status_code=409, detail=conflict_message(cert_id))
 
     return CertificateResponse(
         certificate_id=cert_id,
-        verification_code=verification_code
+        verification_code=verification_code,
+        already_issued=status == "issued"
+    )
+
+
+async def run_generate_job(payload):
+    response = await issue_certificate(CertificateRequest.model_validate(payload), block=True)
+    return response.model_dump()
+
+
+def get_job_queue(request: Request):
+    """The job queue ``create_combined_app`` gave the app serving this request."""
+    return request.app.state.job_queue
+
+
+@api_app.post("/generate", response_model=CertificateResponse)
+async def generate_certificate_endpoint(
+    request: CertificateRequest,
+    mode: Literal["sync", "async"] = Query("sync", description="'async' queues the job and returns 202 with a job ID"),
+    token: str = Depends(verify_admin_token),
+    job_queue: JobQueue = Depends(get_job_queue)
+):
+    if mode == "async":
+        job_id = await run_in_threadpool(job_queue.enqueue, "generate", request.model_dump())
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}"},
+            headers={"Location": f"/api/jobs/{job_id}"}
+        )
+
+    return await issue_certificate(request)
+
+
+@api_app.get("/jobs/{job_id}")
+def get_job(job_id: str, token: str = Depends(verify_admin_token), job_queue: JobQueue = Depends(get_job_queue)):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "result": job["result"],
+        "error": job["error"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+
+
+async def read_batch_items(request):
+    """Read a batch body sent either as a JSON array or as NDJSON."""
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a list of certificate requests")
+    if len(items) > GENERATE_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Batch larger than {GENERATE_BATCH_MAX} items")
+    return items
+
+
+def batch_result(index, record, error=None, already_issued=False):
+    return {
+        "index": index,
+        "certificate_id": record["id"] if record else None,
+        "verification_code": record["verification_code"] if record else None,
+        "already_issued": already_issued,
+        "error": error
+    }
+
+
+async def render_batch_item(index, record, slots):
+    result = batch_result(index, record)
+    try:
+        async with slots:
+            await generate_certificate_pdf(record, block=True)
+    except HTTPException as e:
+        result["error"] = e.detail
+    return result
+
+
+@api_app.post("/generate/batch")
+async def generate_certificate_batch(
+    request: Request,
+    token: str = Depends(verify_admin_token)
+):
+    """Issue many certificates at once, streaming one NDJSON line per item.
+
+    All new items are stored in a single write before rendering starts.
+    Items that fail validation, collide with a different certificate or
+    were already issued are reported first, the rest in completion order.
+    """
+    items = await read_batch_items(request)
+
+    early = []
+    records = []
+    for index, item in enumerate(items):
+        try:
+            cert_request = CertificateRequest.model_validate(item)
+        except ValidationError as e:
+            early.append(batch_result(index, None, error=e.errors(include_url=False, include_context=False)))
+            continue
+        records.append((index, issue_certificate_record(cert_request.model_dump())))
+
+    statuses = await run_in_threadpool(issuance_status, [record for _, record in records])
+    new_records = []
+    for (index, record), status in zip(records, statuses):
+        if status == "new":
+            new_records.append((index, record))
+        elif status == "issued":
+            early.append(batch_result(index, record, already_issued=True))
+        else:
+            early.append(batch_result(index, record, error=conflict_message(record["id"])))
+    records = new_records
+
+    if records:
+        statuses = await run_in_threadpool(CertificateDB().insert_certificates, [record for _, record in records])
+        new_records = []
+        for (index, record), status in zip(records, statuses):
+            if status == "new":
+                new_records.append((index, record))
+            elif status == "issued":
+                early.append(batch_result(index, record, already_issued=True))
+            else:
+                early.append(batch_result(index, record, error=conflict_message(record["id"])))
+        records = new_records
+
+    async def stream_results():
+        for result in early:
+            yield json.dumps(result) + "\n"
+        # One batch keeps at most one render per worker in flight, leaving
+        # the rest of the render queue to interactive /view and /download.
+        slots = asyncio.Semaphore(max(render_pool.workers, 1))
+        tasks = [asyncio.ensure_future(render_batch_item(index, record, slots)) for index, record in records]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@api_app.post("/cohort")
+async def generate_cohort_pdf(
+    request: CohortRequest,
+    token: str = Depends(verify_admin_token)
+):
+    """Render issued certificates as the pages of a single PDF, in request order.
+
+    Pages share the fonts, watermark and template layers, so a cohort costs
+    about a kilobyte per certificate. The document is rendered to a
+    temporary file and streamed from disk.
+    """
+    cert_ids = list(dict.fromkeys(request.certificate_ids))
+    if not cert_ids:
+        raise HTTPException(status_code=400, detail="No certificate IDs given")
+    if len(cert_ids) > COHORT_MAX:
+        raise HTTPException(status_code=413, detail=f"Cohort larger than {COHORT_MAX} certificates")
+
+    require_database()
+    found = await run_in_threadpool(CertificateDB().get_certificates, cert_ids)
+    missing = [cert_id for cert_id in cert_ids if cert_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "Certificates not found", "missing": missing})
+    records = [found[cert_id].to_dict() for cert_id in cert_ids]
+
+    fd, output_path = tempfile.mkstemp(prefix="cohort-", suffix=".pdf")
+    os.close(fd)
+    try:
+        await render_pool.render_cohort(records, output_path)
+    except RenderPoolSaturated:
+        os.unlink(output_path)
+        raise HTTPException(
+            status_code=503,
+            detail="Certificate renderer is busy, retry later",
+            headers={"Retry-After": str(CERT_RENDER_RETRY_AFTER)}
+        )
+    except Exception as e:
+        os.unlink(output_path)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return FileResponse(
+        output_path,
+        media_type="application/pdf",
+        filename=request.filename,
+        background=BackgroundTask(os.unlink, output_path)
     )
 
 web_app = FastAPI()
@@ -225,8 +603,8 @@ async def get_validation_page():
         raise HTTPException(status_code=404, detail="Validation page not found")
 
 
-@web_app.get("/validate")
-async def validate_certificate_web(certificate_id: str, verification_code: str, request: Request):
+@web_app.get("/validate", dependencies=[Depends(limit_validation)])
+def validate_certificate_web(certificate_id: str, verification_code: str, request: Request):
     validation_response = validate_and_respond(certificate_id, verification_code)
 
     accept_header = request.headers.get("accept", "")
@@ -246,40 +624,68 @@ async def validate_certificate_web(certificate_id: str, verification_code: str,
     return RedirectResponse(url=f"/?certificate_id={certificate_id}&verification_code={verification_code}")
 
 
-@web_app.get("/view")
-async def view_certificate(certificate_id: str, verification_code: str):
-    validation_response = validate_and_respond(certificate_id, verification_code)
+@web_app.get("/view", dependencies=[Depends(limit_validation)])
+async def view_certificate(certificate_id: str, verification_code: str, request: Request):
+    validation_response = await run_in_threadpool(validate_and_respond, certificate_id, verification_code)
 
     if not validation_response.valid:
         raise HTTPException(status_code=404, detail="Invalid certificate")
 
-    pdf_path = generate_certificate_pdf(validation_response.certificate_data)
-
-    return FileResponse(
-        path=pdf_path,
-        media_type="application/pdf"
-    )
+    return await pdf_response(request, validation_response.certificate_data)
 
 
-@web_app.get("/download")
-async def download_certificate(certificate_id: str, verification_code: str):
-    validation_response = validate_and_respond(certificate_id, verification_code)
+@web_app.get("/download", dependencies=[Depends(limit_validation)])
+async def download_certificate(certificate_id: str, verification_code: str, request: Request):
+    validation_response = await run_in_threadpool(validate_and_respond, certificate_id, verification_code)
 
     if not validation_response.valid:
         raise HTTPException(status_code=404, detail="Invalid certificate")
 
-    pdf_path = generate_certificate_pdf(validation_response.certificate_data)
+    return await pdf_response(
+        request,
+        validation_response.certificate_data,
+        filename=f"certificate_{certificate_id}.pdf"
+    )
 
-    return FileResponse(
-        path=pdf_path,
-        filename=f"certificate_{certificate_id}.pdf",
-        media_type="application/pdf"
+
+def create_api_app(mode=SERVER_MODE, job_queue=None):
+    """The app mounted at ``/api``: a copy of ``api_app``, without the rendering routes in ``validate`` mode."""
+    app = FastAPI(title=api_app.title, description=api_app.description, version=api_app.version)
+    app.user_middleware = list(api_app.user_middleware)
+    app.add_exception_handler(StorageError, storage_error_handler)
+    app.state.job_queue = job_queue
+    router = APIRouter()
+    router.routes.extend(
+        route for route in api_app.router.routes
+        if isinstance(route, APIRoute) and (mode == "full" or "/api" + route.path not in RENDER_ROUTES)
     )
+    app.include_router(router)
+    return app
+
 
+def create_combined_app(mode=SERVER_MODE, jobs_db_file=JOBS_DB_FILE):
+    """Create a combined FastAPI application with both API and web routes.
 
-def create_combined_app():
-    """Create a combined FastAPI application with both API and web routes"""
+    In ``validate`` mode the rendering and issuing routes are left out and
+    nothing is rendered or preloaded at startup. In ``full`` mode the app
+    gets its own job queue in ``jobs_db_file`` and runs its jobs; both are
+    kept in ``app.state``.
+    """
     combined_app = FastAPI()
+    combined_app.add_exception_handler(StorageError, storage_error_handler)
+    combined_app.state.job_queue = combined_app.state.job_runner = None
+    if mode == "full":
+        job_queue = JobQueue(jobs_db_file)
+        job_runner = JobRunner(job_queue, {"generate": run_generate_job}, workers=JOB_WORKERS)
+        combined_app.state.job_queue = job_queue
+        combined_app.state.job_runner = job_runner
+        combined_app.add_event_handler("startup", preload_assets)
+        combined_app.add_event_handler("startup", render_pool.start)
+        combined_app.add_event_handler("startup", job_runner.start)
+        combined_app.add_event_handler("shutdown", job_runner.stop)
+        combined_app.add_event_handler("shutdown", render_pool.shutdown)
+        register_check("assets_loaded", assets_loaded)
+        register_check("render_pool_started", lambda: render_pool.ready)
 
     combined_app.add_middleware(
         CORSMiddleware,
@@ -288,11 +694,17 @@ def create_combined_app():
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    combined_app.add_middleware(ServerTimingMiddleware)
+    combined_app.add_middleware(RequestMetricsMiddleware)
+    combined_app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+    combined_app.add_route("/healthz", liveness, include_in_schema=False)
+    combined_app.add_route("/readyz", readiness, include_in_schema=False)
 
-    combined_app.mount("/api", api_app)
+    combined_app.mount("/api", create_api_app(mode, combined_app.state.job_queue))
 
     for route in web_app.routes:
-        combined_app.routes.append(route)
+        if mode == "full" or route.path not in RENDER_ROUTES:
+            combined_app.routes.append(route)
 
     return combined_app
 
@@ -0,0 +1,27 @@
+import os
+import time
+
+from starlette.responses import JSONResponse
+
+_started = time.time()
+_checks = {}
+
+
+def register_check(name, check):
+    """Make readiness wait until ``check()`` returns true."""
+    _checks[name] = check
+
+
+async def liveness(request):
+    """The process is up and its event loop answers."""
+    return JSONResponse({"status": "alive", "pid": os.getpid(), "uptime_seconds": round(time.time() - _started, 1)})
+
+
+async def readiness(request):
+    """Ready once every registered check passes, e.g. assets loaded and render workers up."""
+    checks = {name: bool(check()) for name, check in _checks.items()}
+    ready = all(checks.values())
+    return JSONResponse(
+        {"status": "ready" if ready else "warming_up", "pid": os.getpid(), "checks": checks},
+        status_code=200 if ready else 503
+    )
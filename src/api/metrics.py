@@ -0,0 +1,61 @@
+import os
+import time
+
+from starlette.responses import Response
+
+from src.core.metrics import registry, CONTENT_TYPE
+
+CERT_METRICS_TOKEN = os.environ.get("CERT_METRICS_TOKEN")
+
+request_seconds = registry.histogram(
+    "cert_http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response.",
+    ("method", "route", "status")
+)
+
+
+class RequestMetricsMiddleware:
+    """Times every HTTP request by its route template, e.g. ``/api/jobs/{job_id}``.
+
+    Labelling by template rather than path keeps the number of series
+    bounded; requests that match no route share the ``unmatched`` label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        root_path = scope.get("root_path", "")
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Routing fills in the matched route, and mounts extend the
+            # root path, on the scope shared with this middleware.
+            route = scope.get("route")
+            mount = scope.get("root_path", "")[len(root_path):]
+            if route is not None:
+                label = mount + route.path
+            else:
+                label = mount or "unmatched"
+            request_seconds.observe(time.perf_counter() - started, scope["method"], label, str(status))
+
+
+def metrics_endpoint(request):
+    # Collectors read storage and caches; as a plain function this runs in
+    # the threadpool instead of on the event loop.
+    if CERT_METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {CERT_METRICS_TOKEN}":
+        return Response(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return Response(registry.expose(), media_type=CONTENT_TYPE)
@@ -0,0 +1,188 @@
+"""Pre-forking production server.
+
+The parent imports the app, loads fonts, images and templates and renders
+one throwaway certificate, then forks the workers. They start with all of
+that in memory, shared copy-on-write with the parent, and each runs its
+own uvicorn server on the inherited listening socket. A worker that exits
+(after ``max_requests``, or on a crash) is replaced by a new fork of the
+warm parent, so replacements are ready as soon as they start. A
+validate-only server (``CERT_SERVER_MODE=validate``) skips the warm-up.
+
+Workers publish their metrics and profiler samples to a directory the
+parent creates (see ``src.core.worker_state``), so ``/metrics`` and the
+profiler endpoints cover the whole server whichever worker answers.
+"""
+import os
+import gc
+import time
+import random
+import shutil
+import signal
+import socket
+import logging
+import tempfile
+
+from src.core import worker_state
+from src.core.metrics import archive_worker
+
+CERT_SERVER_WORKERS = int(os.environ.get("CERT_SERVER_WORKERS", "1"))
+CERT_SERVER_MAX_REQUESTS = int(os.environ.get("CERT_SERVER_MAX_REQUESTS", "0"))
+CERT_SERVER_MAX_REQUESTS_JITTER = int(os.environ.get("CERT_SERVER_MAX_REQUESTS_JITTER", "-1"))
+CERT_SERVER_GRACEFUL_TIMEOUT = float(os.environ.get("CERT_SERVER_GRACEFUL_TIMEOUT", "30"))
+
+logger = logging.getLogger("certificates.server")
+
+WARMUP_RECORD = {
+    "student_name": "Warm Up",
+    "course_name": "Warm Up",
+    "issue_date": "2025-01-01",
+    "instructor": "Warm Up",
+    "instructor_title": "Warm Up",
+    "co_instructor": "Warm Up",
+    "co_instructor_title": "Warm Up",
+    "organization": "Warm Up",
+    "place": "Warm Up",
+    "certification_type": "Warm Up",
+    "hours": "1",
+}
+
+
+def warm_up():
+    from src.core.assets import preload_assets
+    from src.core.templates import preload_templates
+    from src.core.certificate_renderer import render_certificate_pdf, render_phase_seconds
+
+    started = time.perf_counter()
+    preload_assets()
+    preload_templates()
+    # Pulls in the parts of ReportLab that are only imported on first use.
+    render_certificate_pdf(WARMUP_RECORD)
+    render_phase_seconds.drain()
+    logger.info("Warmed up", extra={"duration_ms": round((time.perf_counter() - started) * 1000, 1)})
+
+
+class PreforkServer:
+    def __init__(self, app, host, port, workers, max_requests=0, max_requests_jitter=0,
+                 graceful_timeout=CERT_SERVER_GRACEFUL_TIMEOUT):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.children = {}
+        self.stopping = False
+        self.socket = None
+
+    def bind(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self.socket = sock
+
+    def _serve(self):
+        import uvicorn
+
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        max_requests = None
+        if self.max_requests:
+            # Jitter keeps the workers from all recycling at the same moment.
+            max_requests = self.max_requests + random.randint(0, self.max_requests_jitter)
+        config = uvicorn.Config(self.app, limit_max_requests=max_requests, timeout_graceful_shutdown=self.graceful_timeout)
+        worker_state.start_publishing()
+        try:
+            uvicorn.Server(config).run(sockets=[self.socket])
+        finally:
+            worker_state.publish()
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                self._serve()
+            except BaseException:
+                logger.exception("Worker failed")
+                status = 1
+            finally:
+                os._exit(status)
+        self.children[pid] = time.monotonic()
+        logger.info("Started worker", extra={"worker_pid": pid})
+
+    def _stop(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info("Stopping workers", extra={"signal": signal.Signals(signum).name})
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        signal.alarm(int(self.graceful_timeout) + 5)
+
+    def _kill(self, signum, frame):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        self.bind()
+        # Objects created so far are never freed; keeping the collector off
+        # them stops it from touching (and so copying) their shared pages.
+        gc.freeze()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGALRM, self._kill)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            logger.info("Worker exited", extra={"worker_pid": pid, "exit_code": code})
+            archive_worker(pid)
+            if self.stopping:
+                continue
+            if code != 0 and time.monotonic() - started < 1:
+                # Failing right at startup; don't fork in a tight loop.
+                time.sleep(1)
+            self.spawn()
+        self.socket.close()
+
+
+def serve(host="0.0.0.0", port=8050, workers=CERT_SERVER_WORKERS, max_requests=CERT_SERVER_MAX_REQUESTS,
+          max_requests_jitter=CERT_SERVER_MAX_REQUESTS_JITTER):
+    # Render processes are per worker; unless configured, split the CPUs
+    # between the workers' pools instead of giving each one per CPU.
+    os.environ.setdefault("CERT_RENDER_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+    if max_requests_jitter < 0:
+        max_requests_jitter = max_requests // 10
+
+    from src.api.api import app
+    from src.api.certificate_service import SERVER_MODE
+    from src.core.profiler import profiler
+    if SERVER_MODE == "full":
+        warm_up()
+    worker_state.shared_dir = tempfile.mkdtemp(prefix="cert-workers-")
+    profiler.share()
+    try:
+        PreforkServer(app, host, port, workers, max_requests, max_requests_jitter).run()
+    finally:
+        shutil.rmtree(worker_state.shared_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,92 @@
+import time
+import ipaddress
+import threading
+from collections import OrderedDict
+
+
+def parse_networks(value):
+    """Networks from a comma-separated list of addresses and CIDR ranges."""
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip()]
+
+
+def _in_networks(address, networks):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def client_address(request, trusted_proxies=()):
+    """The address a request came from, looking through trusted proxies.
+
+    When the peer is one of ``trusted_proxies``, ``X-Forwarded-For`` is read
+    from the right and the first address that is not a trusted proxy is
+    the client; the header is ignored from anyone else, who could forge it.
+    """
+    address = request.client.host if request.client else "unknown"
+    if not trusted_proxies or not _in_networks(address, trusted_proxies):
+        return address
+    forwarded = [item.strip() for item in request.headers.get("x-forwarded-for", "").split(",") if item.strip()]
+    for hop in reversed(forwarded):
+        address = hop
+        if not _in_networks(hop, trusted_proxies):
+            break
+    return address
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets: ``rate`` tokens per second, up to ``burst``.
+
+    Only the ``max_clients`` most recently seen clients are tracked; a
+    client that was evicted starts again with a full bucket.
+    """
+
+    def __init__(self, rate, burst, max_clients=100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def take(self, client, cost=1):
+        """Spend ``cost`` tokens; return 0 if allowed, else the seconds to wait.
+
+        A cost above ``burst`` could never be paid; callers reject such
+        requests before asking.
+        """
+        if not self.enabled:
+            return 0
+        if cost > self.burst:
+            raise ValueError(f"Cost {cost} exceeds the bucket size {self.burst}")
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0
+                self.allowed += 1
+            else:
+                wait = (cost - tokens) / self.rate
+                self.rejected += 1
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "rate": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,43 @@
+import os
+import time
+
+from src.core.profiler import profiler
+from src.core.request_timer import start_timer, stop_timer
+
+CERT_SERVER_TIMING = os.environ.get("CERT_SERVER_TIMING", "1") == "1"
+
+
+class ServerTimingMiddleware:
+    """Times the phases of each request and reports them in ``Server-Timing``.
+
+    Code on the request's path adds phases with ``request_timer.phase`` or
+    ``record_phase``, e.g. ``validate;dur=0.41, render_draw;dur=5.12,
+    total;dur=13.80``. ``total`` runs until the response starts. The same
+    hook starts the sampling profiler for the requests it picks.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiled = profiler.should_sample()
+        if profiled:
+            profiler.begin()
+        timer, token = start_timer()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and CERT_SERVER_TIMING:
+                value = timer.server_timing(total=time.perf_counter() - timer.started)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", value.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            stop_timer(token)
+            if profiled:
+                profiler.end()
@@ -0,0 +1,109 @@
+import os
+import io
+import time
+import threading
+
+from src.core.request_timer import record_phase
+
+# ReportLab and Pillow are imported by the loaders, not here, so that a
+# process which never renders (a validate-only server) never loads them.
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "assets")
+
+SIGNATURE_FONT = "DancingScript-Regular"
+WATERMARK_SIZE = 800
+
+_loaders = {}
+_assets = {}
+_lock = threading.RLock()
+
+
+def register_asset(name, loader):
+    """Register a loader for a process-wide asset. It runs at most once."""
+    _loaders[name] = loader
+
+
+def get_asset(name):
+    try:
+        return _assets[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in _assets:
+            started = time.perf_counter()
+            _assets[name] = _loaders[name]()
+            record_phase("asset_load", time.perf_counter() - started)
+        return _assets[name]
+
+
+def preload_assets():
+    """Load every registered asset now instead of on the first render."""
+    for name in list(_loaders):
+        get_asset(name)
+
+
+def assets_loaded():
+    return all(name in _assets for name in _loaders)
+
+
+def create_kubernetes_logo(size=300):
+    from PIL import Image as PILImage
+
+    logo_path = os.path.join(ASSETS_DIR, "kubernetes_logo.svg.png")
+
+    if not os.path.exists(logo_path):
+        return None
+
+    try:
+        img = PILImage.open(logo_path)
+        img = img.resize((size, size), PILImage.Resampling.LANCZOS)
+        processed_img = io.BytesIO()
+        img.save(processed_img, format='PNG')
+        processed_img.seek(0)
+        return processed_img
+    except Exception:
+        return None
+
+
+def _load_signature_font():
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    font_path = os.path.join(ASSETS_DIR, "DancingScript-Regular.ttf")
+    if not os.path.exists(font_path):
+        return None
+    pdfmetrics.registerFont(TTFont(SIGNATURE_FONT, font_path))
+    return SIGNATURE_FONT
+
+
+def _load_watermark_logo():
+    from reportlab.lib.utils import ImageReader
+
+    k8s_logo = create_kubernetes_logo(WATERMARK_SIZE)
+    return ImageReader(k8s_logo) if k8s_logo else None
+
+
+def _load_watermark_xobject():
+    # ReportLab re-compresses an image for every document it is drawn into;
+    # the encoded stream is identical each time, so it is built once here and
+    # registered with every canvas by the renderer.
+    from reportlab.pdfbase import pdfdoc
+
+    logo = get_asset("watermark_logo")
+    if logo is None:
+        return None
+
+    xobject = pdfdoc.PDFImageXObject("k8s-watermark", logo, mask='auto')
+    smask = getattr(xobject, '_smask', None)
+    if smask:
+        del xobject._smask
+        xobject.smask = pdfdoc.PDFObjectReference(pdfdoc.xObjectName(smask.name))
+    xobject.softmask = smask
+    # For draw_xobject's fallback when the canvas internals it uses are missing.
+    xobject.image = logo
+    return xobject
+
+
+register_asset("signature_font", _load_signature_font)
+register_asset("watermark_logo", _load_watermark_logo)
+register_asset("watermark_xobject", _load_watermark_xobject)
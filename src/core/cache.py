@@ -0,0 +1,212 @@
+import time
+import threading
+from collections import OrderedDict
+
+from src.core.records import CertificateRecord
+from src.core.request_timer import record_phase
+from src.core.storage import storage_seconds
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU mapping with hit/miss counters."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SizedLRUCache:
+    """LRU mapping of bytes values bounded by their total size rather than count."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._data[key] = value
+            self.current_bytes += len(value)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class RecordCache:
+    """Read-through cache of certificate records in front of a storage backend.
+
+    Entries are tagged with the backend's ``generation()`` at load time and
+    only served while it is unchanged, so records written by another process
+    sharing the same volume are picked up. Misses are cached as well, which
+    keeps repeated lookups of unknown ids off the storage.
+
+    Records are held and returned as read-only ``CertificateRecord``
+    objects, so hits are shared rather than copied.
+    """
+
+    def __init__(self, maxsize):
+        self._lru = LRUCache(maxsize)
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _current_generation(self, storage):
+        generation = storage.generation()
+        with self._lock:
+            known = self._generations.get(id(storage), _MISSING)
+            self._generations[id(storage)] = generation
+        if known is not _MISSING and known != generation:
+            self.invalidations += 1
+            self._lru.clear()
+        return generation
+
+    def get(self, storage, cert_id):
+        generation = self._current_generation(storage)
+        key = (id(storage), cert_id)
+        entry = self._lru.get(key)
+        if entry is not None and entry[0] == generation:
+            self.hits += 1
+            cert_data = entry[1]
+        else:
+            self.misses += 1
+            started = time.perf_counter()
+            cert_data = storage.get(cert_id)
+            elapsed = time.perf_counter() - started
+            storage_seconds.observe(elapsed, storage.name, "load")
+            record_phase("storage_load", elapsed)
+            if cert_data is not None:
+                cert_data = CertificateRecord.from_dict(cert_data)
+            self._lru.put(key, (generation, cert_data))
+        return cert_data
+
+    def get_many(self, storage, cert_ids):
+        """Look up many ids, fetching all cache misses with one storage call."""
+        generation = self._current_generation(storage)
+        found = {}
+        missing = []
+        for cert_id in dict.fromkeys(cert_ids):
+            entry = self._lru.get((id(storage), cert_id))
+            if entry is not None and entry[0] == generation:
+                self.hits += 1
+                found[cert_id] = entry[1]
+            else:
+                self.misses += 1
+                missing.append(cert_id)
+
+        if missing:
+            started = time.perf_counter()
+            loaded = storage.get_many(missing)
+            elapsed = time.perf_counter() - started
+            storage_seconds.observe(elapsed, storage.name, "load")
+            record_phase("storage_load", elapsed)
+            for cert_id in missing:
+                cert_data = loaded.get(cert_id)
+                if cert_data is not None:
+                    cert_data = CertificateRecord.from_dict(cert_data)
+                found[cert_id] = cert_data
+                self._lru.put((id(storage), cert_id), (generation, cert_data))
+
+        return {cert_id: cert_data for cert_id, cert_data in found.items() if cert_data is not None}
+
+    def clear(self):
+        with self._lock:
+            self._generations.clear()
+        self._lru.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._lru),
+            "maxsize": self._lru.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self._lru.evictions,
+            "invalidations": self.invalidations,
+        }
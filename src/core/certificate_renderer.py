@@ -1,35 +1,56 @@
 import os
 import io
-import json
 import hashlib
 import base64
+import json
+import time
+import logging
 from datetime import datetime
 
-from reportlab.lib.pagesizes import landscape, letter
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
-from reportlab.platypus import Image
-from PIL import Image as PILImage
+from src.core.cache import RecordCache, SizedLRUCache
+from src.core.id_filter import IdFilter
+from src.core.metrics import registry
+from src.core.request_timer import record_phase
+from src.core.storage import open_storage, storage_seconds
+from src.core.templates import get_template, template_version
 
 CERT_DB_FILE = os.environ.get("CERT_DB_PATH", "data/certificates_db.json")
-
-
-def create_kubernetes_logo(size=300):
-    logo_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "assets/kubernetes_logo.svg.png")
-
-    if not os.path.exists(logo_path):
-        return None
-
-    try:
-        img = PILImage.open(logo_path)
-        img = img.resize((size, size), PILImage.Resampling.LANCZOS)
-        processed_img = io.BytesIO()
-        img.save(processed_img, format='PNG')
-        processed_img.seek(0)
-        return processed_img
-    except Exception:
-        return None
+CERT_DB_BACKEND = os.environ.get("CERT_DB_BACKEND", "json")
+CERT_CACHE_SIZE = int(os.environ.get("CERT_CACHE_SIZE", "10000"))
+CERT_ID_FILTER = os.environ.get("CERT_ID_FILTER", "1") == "1"
+CERT_PDF_CACHE_BYTES = int(os.environ.get("CERT_PDF_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# Bump whenever the renderer changes its output, so cached PDFs and ETags
+# handed out for the old output are not reused. Layout changes bump the
+# "version" in the template file instead.
+TEMPLATE_VERSION = "3"
+
+RENDER_FIELDS = (
+    "student_name",
+    "course_name",
+    "issue_date",
+    "instructor",
+    "instructor_title",
+    "co_instructor",
+    "co_instructor_title",
+    "organization",
+    "place",
+    "certification_type",
+    "hours",
+    "template",
+)
+
+logger = logging.getLogger("certificates.renderer")
+
+render_phase_seconds = registry.histogram(
+    "cert_render_phase_seconds",
+    "Time spent rendering one certificate, by phase: template and asset loading, drawing, and writing the PDF.",
+    ("phase",)
+)
+
+_record_cache = RecordCache(CERT_CACHE_SIZE)
+_pdf_cache = SizedLRUCache(CERT_PDF_CACHE_BYTES)
+_id_filter = IdFilter() if CERT_ID_FILTER else None
 
 
 def read_input_file(file_path):
@@ -97,8 +118,8 @@ def generate_verification_code(cert_id, student_name, course_name):
     return verification_code.upper()
 
 
-def save_certificate_data(cert_id, verification_code, student_name, course_name, issue_date, instructor, instructor_title, co_instructor, co_instructor_title, organization, place, certification_type, hours):
-    cert_data = {
+def build_certificate_record(cert_id, verification_code, student_name, course_name, issue_date, instructor, instructor_title, co_instructor, co_instructor_title, organization, place, certification_type, hours, template=""):
+    return {
         "id": cert_id,
         "verification_code": verification_code,
         "student_name": student_name,
@@ -112,9 +133,25 @@ def save_certificate_data(cert_id, verification_code, student_name, course_name,
         "organization": organization,
         "place": place,
         "certification_type": certification_type,
-        "hours": hours
+        "hours": hours,
+        "template": template
     }
 
+
+def issue_certificate_record(data):
+    """Build a new record, with its id and verification code, from request fields."""
+    fields = {field: data.get(field, "") for field in RENDER_FIELDS}
+    cert_id = generate_secure_certificate_id(fields["student_name"], fields["course_name"], fields["issue_date"])
+    verification_code = generate_verification_code(cert_id, fields["student_name"], fields["course_name"])
+    return build_certificate_record(cert_id, verification_code, **fields)
+
+
+def save_certificate_data(cert_id, verification_code, student_name, course_name, issue_date, instructor, instructor_title, co_instructor, co_instructor_title, organization, place, certification_type, hours, template=""):
+    cert_data = build_certificate_record(
+        cert_id, verification_code, student_name, course_name, issue_date, instructor, instructor_title,
+        co_instructor, co_instructor_title, organization, place, certification_type, hours, template
+    )
+
     db = CertificateDB()
     db.save_certificate(cert_data)
 
@@ -122,222 +159,273 @@ def save_certificate_data(cert_id, verification_code, student_name, course_name,
 
 
 class CertificateDB:
-    def __init__(self, db_file=CERT_DB_FILE):
+    def __init__(self, db_file=CERT_DB_FILE, backend=CERT_DB_BACKEND):
         self.db_file = db_file
+        self.storage = open_storage(db_file, backend)
+        # The snapshot is already searched in memory; a filter would only
+        # hold a second copy of its ids.
+        self.id_filter = None if self.storage.name == "snapshot" else _id_filter
 
-    def _load_db(self):
-        if not os.path.exists(self.db_file):
-            return {}
-        try:
-            with open(self.db_file, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {}
-
-    def _save_db(self, data):
-        with open(self.db_file, 'w') as f:
-            json.dump(data, f, indent=2)
+    def exists(self):
+        return self.storage.exists()
 
     def get_certificate(self, cert_id):
-        all_certs = self._load_db()
-        return all_certs.get(cert_id)
+        if self.id_filter is not None and not self.id_filter.might_contain(self.storage, cert_id):
+            return None
+        return _record_cache.get(self.storage, cert_id)
+
+    def get_certificates(self, cert_ids):
+        """Return a dict of the stored ``CertificateRecord`` objects among ``cert_ids``."""
+        if self.id_filter is not None:
+            cert_ids = [cert_id for cert_id in cert_ids if self.id_filter.might_contain(self.storage, cert_id)]
+        return _record_cache.get_many(self.storage, cert_ids)
 
     def save_certificate(self, cert_data):
-        all_certs = self._load_db()
-        all_certs[cert_data['id']] = cert_data
-        self._save_db(all_certs)
+        started = time.perf_counter()
+        self.storage.put(cert_data)
+        elapsed = time.perf_counter() - started
+        storage_seconds.observe(elapsed, self.storage.name, "save")
+        record_phase("storage_save", elapsed)
+
+    def save_certificates(self, records):
+        """Store many records in a single write (one transaction on SQLite)."""
+        started = time.perf_counter()
+        self.storage.put_many(records)
+        elapsed = time.perf_counter() - started
+        storage_seconds.observe(elapsed, self.storage.name, "save")
+        record_phase("storage_save", elapsed)
+
+    def insert_certificates(self, records):
+        """Store the records whose id is still free; never replaces a stored one.
+
+        The check and the write are one transaction (one locked rewrite or
+        append for the file backends), so of two concurrent issuers of the
+        same id exactly one stores its record. Returns a status per record
+        as ``issuance_status`` does, decided by that write.
+        """
+        started = time.perf_counter()
+        existing = self.storage.insert_many(records)
+        elapsed = time.perf_counter() - started
+        storage_seconds.observe(elapsed, self.storage.name, "save")
+        record_phase("storage_save", elapsed)
+
+        statuses = []
+        for record, stored in zip(records, existing):
+            if stored is None:
+                statuses.append("new")
+            elif certificate_content_hash(stored) == certificate_content_hash(record):
+                statuses.append("issued")
+            else:
+                statuses.append("conflict")
+        return statuses
+
+
+def _collect_caches():
+    caches = {"records": _record_cache.stats(), "pdf": _pdf_cache.stats()}
+    for metric, kind, help in (
+        ("hits", "counter", "Cache lookups that were answered from memory."),
+        ("misses", "counter", "Cache lookups that went to storage or the renderer."),
+        ("evictions", "counter", "Entries dropped to stay within the cache size."),
+        ("hit_ratio", "gauge", "Share of cache lookups that were hits since start."),
+    ):
+        name = f"cert_cache_{metric}_total" if kind == "counter" else f"cert_cache_{metric}"
+        yield name, kind, help, [({"cache": cache}, stats[metric]) for cache, stats in caches.items()]
+    filter_stats = get_id_filter_stats()
+    if filter_stats is not None:
+        yield "cert_id_filter_checks_total", "counter", "Certificate IDs checked against the Bloom filter, by outcome.", [
+            ({"outcome": outcome}, filter_stats[outcome]) for outcome in ("rejected", "passed", "bypassed")
+        ]
+
+
+registry.add_collector(_collect_caches)
+
+
+def get_cache_stats():
+    return _record_cache.stats()
+
+
+def get_id_filter_stats():
+    return _id_filter.stats() if _id_filter is not None else None
 
 
 def validate_certificate(cert_id, verification_code=None):
+    """Return ``(is_valid, record)``; ``record`` is a ``CertificateRecord``, use ``to_dict()`` for a dict."""
     db = CertificateDB()
     cert_data = db.get_certificate(cert_id)
 
     if not cert_data:
         return False, None
 
-    if verification_code and cert_data["verification_code"] != verification_code:
+    if verification_code and cert_data.verification_code != verification_code:
         return False, cert_data
 
     return True, cert_data
 
 
-def generate_certificate(student_name, course_name, issue_date, instructor, instructor_title, co_instructor, co_instructor_title, organization, place, certification_type, hours, output_path):
-    K8S_BLUE = (50/255, 109/255, 230/255)
-
-    input_data = {
-        'student': student_name,
-        'course': course_name,
-        'teacher': instructor,
-        'co-teacher': co_instructor,
-        'date': issue_date,
-        'certification_type': certification_type,
-        'instructor_title': instructor_title,
-        'co_instructor_title': co_instructor_title,
-        'organization': organization,
-        'hours': hours,
-        'place': place
-    }
+def validate_certificates(pairs):
+    """Validate many ``(cert_id, verification_code)`` pairs with one store lookup.
 
-    main_font = 'Helvetica'
-    main_font_bold = 'Helvetica-Bold'
-    secondary_font = 'Helvetica'
-    signature_font = 'DancingScript-Regular'
-
-    font_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'assets/DancingScript-Regular.ttf')
-    if os.path.exists(font_path):
-        pdfmetrics.registerFont(TTFont('DancingScript-Regular', font_path))
-
-    page_width, page_height = landscape(letter)
-    c = canvas.Canvas(output_path, pagesize=(page_width, page_height))
-    c.setAuthor("TestCraft")
-    c.setTitle("Kubernetes Certification")
-    c.setSubject("Certificate of Completion")
-
-    c.setFillColorRGB(1, 1, 1)
-    c.rect(0, 0, page_width, page_height, fill=1)
-
-    c.setFillColorRGB(*K8S_BLUE)
-    c.rect(0, page_height - 45, page_width, 45, fill=1)
-
-    c.setFont(main_font_bold, 24)
-    c.setFillColorRGB(1, 1, 1)
-    c.drawString(30, page_height - 30, input_data['organization'])
-
-    c.setFont(main_font, 20)
-    cert_text = input_data['certification_type']
-    cert_width = c.stringWidth(cert_text, main_font, 20)
-    c.drawString(page_width - cert_width - 30, page_height - 30, cert_text)
-
-    c.setFillColorRGB(*K8S_BLUE)
-    c.rect(0, 0, page_width, 25, fill=1)
-
-    c.setFont(main_font_bold, 42)
-    c.setFillColorRGB(*K8S_BLUE)
-    title = "Certificate of Completion"
-    title_width = c.stringWidth(title, main_font_bold, 42)
-    c.drawString((page_width - title_width) / 2, page_height - 130, title)
-
-    c.setStrokeColorRGB(*K8S_BLUE)
-    c.setLineWidth(1)
-    line_width = 350
-    c.line((page_width - line_width) / 2, page_height - 145,
-           (page_width + line_width) / 2, page_height - 145)
-
-    c.setFont(secondary_font, 16)
-    c.setFillColorRGB(0.2, 0.2, 0.2)
-    certifies_text = "This certificate is awarded to"
-    certifies_width = c.stringWidth(certifies_text, secondary_font, 16)
-    c.drawString((page_width - certifies_width) / 2, page_height - 195, certifies_text)
-
-    student_name = input_data.get('student', '')
-    c.setFont(signature_font, 42)
-    c.setFillColorRGB(0, 0, 0)
-    name_width = c.stringWidth(student_name, signature_font, 42)
-    c.drawString((page_width - name_width) / 2, page_height - 260, student_name)
-
-    c.setStrokeColorRGB(0, 0, 0)
-    c.setLineWidth(1)
-    student_line_width = 450
-    c.line((page_width - student_line_width) / 2, page_height - 275,
-           (page_width + student_line_width) / 2, page_height - 275)
-
-    c.setFont(secondary_font, 16)
-    c.setFillColorRGB(0.2, 0.2, 0.2)
-    completion_text = "For successfully completing the course:"
-    completion_width = c.stringWidth(completion_text, secondary_font, 16)
-    c.drawString((page_width - completion_width) / 2, page_height - 310, completion_text)
-
-    course_name = input_data.get('course', '')
-    hours = input_data.get('hours', '')
-    c.setFont(main_font_bold, 36)
-    c.setFillColorRGB(*K8S_BLUE)
-    course_width = c.stringWidth(course_name, main_font_bold, 36)
-    c.drawString((page_width - course_width) / 2, page_height - 365, course_name)
-
-    formatted_date = format_date(input_data.get('date', None))
-    c.setFont(secondary_font, 16)
-    c.setFillColorRGB(0.2, 0.2, 0.2)
-    place = input_data.get('place', '')
-    date_text = f"Amounting to a total of {hours} hours. Given on {formatted_date} at {place}."
-    date_width = c.stringWidth(date_text, secondary_font, 16)
-    c.drawString((page_width - date_width) / 2, page_height - 415, date_text)
-
-    signature_y = 100
-    signature_line_width = 200
-    teacher_name = input_data.get('teacher', '')
-
-    if input_data.get('co-teacher'):
-        teacher_x = page_width/3
-    else:
-        teacher_x = page_width/2
-
-    c.setFont(signature_font, 22)
-    c.setFillColorRGB(0, 0, 0)
-    teacher_sig_width = c.stringWidth(teacher_name, signature_font, 22)
-    c.drawString(teacher_x - teacher_sig_width/2, signature_y+3, teacher_name)
-
-    c.setStrokeColorRGB(0, 0, 0)
-    c.setLineWidth(1)
-    c.line(teacher_x - signature_line_width/2, signature_y-10,
-           teacher_x + signature_line_width/2, signature_y-10)
-
-    c.setFont(secondary_font, 12)
-    c.setFillColorRGB(0.2, 0.2, 0.2)
-    c.drawString(teacher_x - signature_line_width/2, signature_y - 30, teacher_name)
-
-    c.setFont(secondary_font, 10)
-    instructor_title = input_data.get('instructor_title', '')
-    c.drawString(teacher_x - signature_line_width/2, signature_y - 45, instructor_title)
-
-    if input_data.get('co-teacher'):
-        co_teacher_x = 2 * page_width/3
-        co_teacher_name = input_data.get('co-teacher', '')
-
-        c.setFont(signature_font, 22)
-        c.setFillColorRGB(0, 0, 0)
-        co_teacher_sig_width = c.stringWidth(co_teacher_name, signature_font, 22)
-        c.drawString(co_teacher_x - co_teacher_sig_width/2, signature_y+3, co_teacher_name)
-
-        c.setStrokeColorRGB(0, 0, 0)
-        c.setLineWidth(1)
-        c.line(co_teacher_x - signature_line_width/2, signature_y-10,
-               co_teacher_x + signature_line_width/2, signature_y-10)
-
-        c.setFont(secondary_font, 12)
-        c.setFillColorRGB(0.2, 0.2, 0.2)
-        c.drawString(co_teacher_x - signature_line_width/2, signature_y - 30, co_teacher_name)
-
-        c.setFont(secondary_font, 10)
-        co_instructor_title = input_data.get('co_instructor_title', '')
-        c.drawString(co_teacher_x - signature_line_width/2, signature_y - 45, co_instructor_title)
-
-    cert_id = generate_secure_certificate_id(student_name, course_name, formatted_date)
-    verification_code = generate_verification_code(cert_id, student_name, course_name)
-
-    c.setFont(secondary_font, 10)
-    c.setFillColorRGB(1, 1, 1)
-    c.drawString(30, 10, f"Powered by {input_data['organization']}")
-
-    c.setFont(secondary_font, 10)
-    verification_text = f"Certificate ID: {cert_id} | Verification Code: {verification_code}"
-    verification_width = c.stringWidth(verification_text, secondary_font, 10)
-    c.drawString(page_width - verification_width - 30, 10, verification_text)
-
-    logo_size = 800
-    k8s_logo = create_kubernetes_logo(logo_size)
-    if k8s_logo:
-        img = Image(k8s_logo, width=logo_size * 0.75, height=logo_size * 0.75)
-        c.saveState()
-        c.translate(page_width * 1.03, 260)
-        c.setFillAlpha(0.10)
-        c.setStrokeAlpha(0.10)
-        img.drawOn(c, -logo_size/2, -logo_size/2)
-        c.restoreState()
+    Returns ``(is_valid, cert_data)`` tuples in input order, with the same
+    meaning as ``validate_certificate``.
+    """
+    db = CertificateDB()
+    found = db.get_certificates([cert_id for cert_id, _ in pairs])
+
+    results = []
+    for cert_id, verification_code in pairs:
+        cert_data = found.get(cert_id)
+        if not cert_data:
+            results.append((False, None))
+        elif verification_code and cert_data.verification_code != verification_code:
+            results.append((False, cert_data))
+        else:
+            results.append((True, cert_data))
+    return results
+
+
+def conflict_message(cert_id):
+    return f"Certificate ID {cert_id} is already issued with different details"
+
+
+def issuance_status(records):
+    """Compare freshly built records with what is already stored, with one lookup.
+
+    A read-only pre-check: ``CertificateDB.insert_certificates`` has the
+    final say once the records are written.
+
+    Returns, in input order, "new", "issued" when an identical certificate
+    already holds the ID (earlier in ``records`` or in the store), or
+    "conflict" when different details collide on the same ID.
+    """
+    stored = CertificateDB().get_certificates([record["id"] for record in records])
+    hashes = {cert_id: certificate_content_hash(record.to_dict()) for cert_id, record in stored.items()}
+
+    statuses = []
+    for record in records:
+        content_hash = certificate_content_hash(record)
+        known = hashes.get(record["id"])
+        if known is None:
+            hashes[record["id"]] = content_hash
+            statuses.append("new")
+        elif known == content_hash:
+            statuses.append("issued")
+        else:
+            statuses.append("conflict")
+    return statuses
+
+
+def certificate_values(cert_data):
+    """Record fields plus the derived values a template can print."""
+    values = {field: cert_data.get(field) or "" for field in RENDER_FIELDS}
+    values["formatted_date"] = format_date(values["issue_date"] or None)
+    values["cert_id"] = generate_secure_certificate_id(
+        values["student_name"], values["course_name"], values["formatted_date"]
+    )
+    values["verification_code"] = generate_verification_code(
+        values["cert_id"], values["student_name"], values["course_name"]
+    )
+    return values
+
+
+def generate_certificate(student_name, course_name, issue_date, instructor, instructor_title, co_instructor, co_instructor_title, organization, place, certification_type, hours, output_path, template=None):
+    values = certificate_values({
+        "student_name": student_name,
+        "course_name": course_name,
+        "issue_date": issue_date,
+        "instructor": instructor,
+        "instructor_title": instructor_title,
+        "co_instructor": co_instructor,
+        "co_instructor_title": co_instructor_title,
+        "organization": organization,
+        "place": place,
+        "certification_type": certification_type,
+        "hours": hours
+    })
+
+    started = time.perf_counter()
+    compiled = get_template(template)
+    loaded = time.perf_counter()
+    c = compiled.begin_document(output_path)
+    compiled.draw_page(c, values)
+    drawn = time.perf_counter()
+    c.save()
+    saved = time.perf_counter()
+
+    render_phase_seconds.observe(loaded - started, "assets")
+    render_phase_seconds.observe(drawn - loaded, "draw")
+    render_phase_seconds.observe(saved - drawn, "save")
+    record_phase("render_assets", loaded - started)
+    record_phase("render_draw", drawn - loaded)
+    record_phase("render_save", saved - drawn)
+    logger.debug(
+        "Rendered certificate",
+        extra={
+            "cert_id": values["cert_id"],
+            "template": compiled.id,
+            "output": output_path if isinstance(output_path, str) else None,
+            "duration_ms": round((saved - started) * 1000, 2),
+        }
+    )
 
+    return output_path
+
+
+def render_certificate_pdf(cert_data):
+    """Render a stored certificate record in memory and return the PDF bytes."""
+    buffer = io.BytesIO()
+    generate_certificate(
+        cert_data["student_name"],
+        cert_data["course_name"],
+        cert_data["issue_date"],
+        cert_data.get("instructor", ""),
+        cert_data.get("instructor_title", ""),
+        cert_data.get("co_instructor", ""),
+        cert_data.get("co_instructor_title", ""),
+        cert_data.get("organization", ""),
+        cert_data.get("place", ""),
+        cert_data.get("certification_type", ""),
+        cert_data.get("hours", ""),
+        buffer,
+        template=cert_data.get("template")
+    )
+    return buffer.getvalue()
+
+
+def render_cohort_pdf(records, output):
+    """Render many records as the pages of one PDF written to ``output``.
+
+    Fonts, the watermark and each template's static layers are stored once
+    and referenced by every page, so a page only adds its own text.
+    """
+    c = None
+    for cert_data in records:
+        template = get_template(cert_data.get("template"))
+        if c is None:
+            c = template.begin_document(output)
+        c.setPageSize(template.page_size)
+        template.draw_page(c, certificate_values(cert_data))
+        c.showPage()
+    if c is None:
+        raise ValueError("A cohort needs at least one certificate")
     c.save()
+    return output
 
-    print(f"Certificate saved as {output_path}")
-    print(f"Certificate ID: {cert_id}")
-    print(f"Verification Code: {verification_code}")
 
-    return output_path
+def certificate_content_hash(cert_data):
+    """Hash of everything that determines a certificate's rendered PDF."""
+    payload = {field: cert_data.get(field, "") for field in RENDER_FIELDS}
+    payload["template_version"] = f"{TEMPLATE_VERSION}:{template_version(cert_data.get('template'))}"
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def get_cached_pdf(cert_data):
+    return _pdf_cache.get(certificate_content_hash(cert_data))
+
+
+def cache_pdf(cert_data, pdf_bytes):
+    _pdf_cache.put(certificate_content_hash(cert_data), pdf_bytes)
+
+
+def get_pdf_cache_stats():
+    return _pdf_cache.stats()
@@ -0,0 +1,144 @@
+import os
+import math
+import time
+import hashlib
+import threading
+
+CERT_ID_FILTER_FP_RATE = float(os.environ.get("CERT_ID_FILTER_FP_RATE", "0.001"))
+CERT_ID_FILTER_REBUILD_SECONDS = float(os.environ.get("CERT_ID_FILTER_REBUILD_SECONDS", "5"))
+
+
+class BloomFilter:
+    """Set membership with no false negatives and a bounded false-positive rate."""
+
+    def __init__(self, capacity, fp_rate):
+        capacity = max(capacity, 1024)
+        self.size = int(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for number in range(self.hashes):
+            yield (first + number * second) % self.size
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class IdFilter:
+    """Bloom filter over every stored certificate id, per storage backend.
+
+    A filter is only trusted while the storage ``generation()`` still
+    matches the one it is tagged with. Writes from this process are added
+    as they happen (the storage reports them as a move from one generation
+    to the next); after writes from other processes the filter is rebuilt
+    in a background thread (at most every ``rebuild_interval`` seconds) and
+    lookups go to the storage until it is ready, so it never turns away an
+    issued certificate.
+    """
+
+    def __init__(self, fp_rate=CERT_ID_FILTER_FP_RATE, rebuild_interval=CERT_ID_FILTER_REBUILD_SECONDS):
+        self.fp_rate = fp_rate
+        self.rebuild_interval = rebuild_interval
+        self._filters = {}
+        self._rebuilding = set()
+        self._pending = {}
+        self._followed = set()
+        self._last_rebuild = {}
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.rejected = 0
+        self.passed = 0
+        self.bypassed = 0
+        self.rebuilds = 0
+        self.updates = 0
+
+    def _build(self, storage, key):
+        try:
+            generation = storage.generation()
+            bloom = BloomFilter(storage.count() * 2, self.fp_rate)
+            for cert_id in storage.iter_ids():
+                bloom.add(cert_id)
+            with self._lock:
+                # Local writes that landed while the ids were being read.
+                for cert_ids, before, after in self._pending.pop(key, []):
+                    if before == generation:
+                        for cert_id in cert_ids:
+                            bloom.add(cert_id)
+                        generation = after
+                self._filters[key] = (generation, bloom)
+                self.rebuilds += 1
+        finally:
+            with self._lock:
+                self._rebuilding.discard(key)
+                self._pending.pop(key, None)
+
+    def _written(self, storage, cert_ids, before, after):
+        """Write listener registered with each storage the filter covers."""
+        key = id(storage)
+        with self._lock:
+            if key in self._rebuilding:
+                self._pending.setdefault(key, []).append((cert_ids, before, after))
+            entry = self._filters.get(key)
+            if entry is not None and entry[0] == before:
+                bloom = entry[1]
+                for cert_id in cert_ids:
+                    bloom.add(cert_id)
+                self._filters[key] = (after, bloom)
+                self.updates += 1
+
+    def _schedule_rebuild(self, storage, key):
+        now = time.monotonic()
+        with self._lock:
+            if key in self._rebuilding or now - self._last_rebuild.get(key, -math.inf) < self.rebuild_interval:
+                return
+            self._rebuilding.add(key)
+            self._last_rebuild[key] = now
+            if key not in self._followed:
+                self._followed.add(key)
+                storage.write_listeners.append(self._written)
+        threading.Thread(target=self._build, args=(storage, key), name="cert-id-filter", daemon=True).start()
+
+    def _current(self, storage):
+        key = id(storage)
+        entry = self._filters.get(key)
+        if entry is not None and entry[0] == storage.generation():
+            return entry[1]
+        if not storage.writes_in_flight:
+            # Re-read: a local write may have been applied just now.
+            entry = self._filters.get(key)
+            if entry is None or entry[0] != storage.generation():
+                self._schedule_rebuild(storage, key)
+        return None
+
+    def might_contain(self, storage, cert_id):
+        """False only when ``cert_id`` is certainly not stored."""
+        self.checks += 1
+        bloom = self._current(storage)
+        if bloom is None:
+            self.bypassed += 1
+            return True
+        if cert_id in bloom:
+            self.passed += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def stats(self):
+        return {
+            "filters": len(self._filters),
+            "checks": self.checks,
+            "rejected": self.rejected,
+            "passed": self.passed,
+            "bypassed": self.bypassed,
+            "rebuilds": self.rebuilds,
+            "updates": self.updates,
+        }
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import sqlite3
+import threading
+
+CERT_JOB_LEASE_SECONDS = int(os.environ.get("CERT_JOB_LEASE_SECONDS", "300"))
+CERT_JOB_MAX_ATTEMPTS = int(os.environ.get("CERT_JOB_MAX_ATTEMPTS", "3"))
+
+
+class JobQueue:
+    """Durable job queue in a local SQLite file.
+
+    A claimed job holds a lease; if the process working on it dies, the
+    lease expires and another worker (in this or another replica) picks it
+    up again, up to ``max_attempts`` times.
+    """
+
+    def __init__(self, db_file, lease_seconds=CERT_JOB_LEASE_SECONDS, max_attempts=CERT_JOB_MAX_ATTEMPTS):
+        self.db_file = db_file
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._schema_ready = False
+        os.register_at_fork(after_in_child=self._forget_connections)
+
+    def _forget_connections(self):
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.db_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            if not self._schema_ready:
+                self._init_schema(conn)
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " result TEXT,"
+            " error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " worker TEXT,"
+            " lease_expires REAL,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL"
+            ")"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+
+    def enqueue(self, kind, payload):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at)"
+            " VALUES (?, ?, 'queued', ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), now, now)
+        )
+        return job_id
+
+    def claim(self, worker):
+        """Take the oldest runnable job, or return None when there is none."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs"
+                " WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?)"
+                " ORDER BY created_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            if row["attempts"] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                    ("Worker lost the job too many times", now, row["id"])
+                )
+                conn.execute("COMMIT")
+                return self.claim(worker)
+
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?,"
+                " lease_expires = ?, updated_at = ? WHERE id = ?",
+                (worker, now + self.lease_seconds, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {"id": row["id"], "kind": row["kind"], "payload": json.loads(row["payload"])}
+
+    def complete(self, job_id, result):
+        self._finish(job_id, "succeeded", result=json.dumps(result))
+
+    def fail(self, job_id, error):
+        self._finish(job_id, "failed", error=error)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, lease_expires = NULL, updated_at = ?"
+            " WHERE id = ?",
+            (status, result, error, time.time(), job_id)
+        )
+
+    def get(self, job_id):
+        row = self._connect().execute(
+            "SELECT id, kind, status, result, error, attempts, created_at, updated_at FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def counts(self):
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return {status: count for status, count in rows}
+
+
+class JobRunner:
+    """Processes queued jobs with a fixed number of asyncio worker tasks.
+
+    ``handlers`` maps a job kind to an ``async def handler(payload)`` whose
+    return value is stored as the job result.
+    """
+
+    def __init__(self, queue, handlers, workers=1, poll_interval=0.5):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks = []
+
+    async def start(self):
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for number in range(self.workers):
+            self._tasks.append(asyncio.ensure_future(self._work(f"{prefix}:{number}")))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self, worker):
+        while True:
+            job = await asyncio.to_thread(self.queue.claim, worker)
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            try:
+                result = await self.handlers[job["kind"]](job["payload"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await asyncio.to_thread(self.queue.fail, job["id"], str(getattr(e, "detail", e)))
+            else:
+                await asyncio.to_thread(self.queue.complete, job["id"], result)
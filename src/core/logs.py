@@ -0,0 +1,56 @@
+import os
+import sys
+import json
+import logging
+
+CERT_LOG_LEVEL = os.environ.get("CERT_LOG_LEVEL", "INFO").upper()
+CERT_LOG_FORMAT = os.environ.get("CERT_LOG_FORMAT", "text")
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line with the message and its ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain text with the ``extra`` fields appended as key=value pairs."""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = " ".join(f"{key}={value}" for key, value in _extra_fields(record).items())
+        return f"{line} {fields}" if fields else line
+
+
+def configure_logging(level=CERT_LOG_LEVEL, format=CERT_LOG_FORMAT):
+    """Send the ``certificates`` loggers to stderr; safe to call more than once."""
+    logger = logging.getLogger("certificates")
+    if getattr(logger, "_configured", False):
+        return logger
+    handler = logging.StreamHandler(sys.stderr)
+    if format == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    logger._configured = True
+    return logger
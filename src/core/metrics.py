@@ -0,0 +1,277 @@
+import os
+import math
+import bisect
+import threading
+
+from src.core import worker_state
+
+# Seconds; covers a cached lookup (~0.1 ms) up to a large cohort render.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def collect(self):
+        samples = [
+            (dict(zip(self.labelnames, values)), child.value)
+            for values, child in list(self._children.items())
+        ]
+        return {"name": self.name, "kind": self.kind, "help": self.help, "samples": samples}
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class _Buckets:
+    __slots__ = ("counts", "sum", "_lock")
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+
+class Histogram(_Metric):
+    """Histogram with fixed buckets; an observation is a bisect and two adds.
+
+    ``drain`` and ``merge`` move observations made in a render worker
+    process into the registry of the process that serves ``/metrics``.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def _new_child(self):
+        return _Buckets(len(self.buckets))
+
+    def observe(self, value, *labels):
+        child = self.labels(*labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with child._lock:
+            child.counts[index] += 1
+            child.sum += value
+
+    def drain(self):
+        """Return and reset this process's observations as plain data."""
+        drained = []
+        for values, child in list(self._children.items()):
+            with child._lock:
+                if any(child.counts):
+                    drained.append((values, child.counts, child.sum))
+                    child.counts = [0] * len(self.buckets)
+                    child.sum = 0.0
+        return drained
+
+    def merge(self, drained):
+        for values, counts, total in drained:
+            child = self.labels(*values)
+            with child._lock:
+                child.counts = [mine + theirs for mine, theirs in zip(child.counts, counts)]
+                child.sum += total
+
+    def collect(self):
+        samples = []
+        for values, child in list(self._children.items()):
+            with child._lock:
+                samples.append((dict(zip(self.labelnames, values)), [list(child.counts), child.sum]))
+        # The +Inf bucket is implied; JSON has no infinity.
+        return {"name": self.name, "kind": self.kind, "help": self.help, "buckets": list(self.buckets[:-1]),
+                "samples": samples}
+
+
+def _render(families):
+    lines = []
+    for family in families:
+        name = family["name"]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        if family["kind"] == "histogram":
+            bounds = list(family["buckets"]) + [math.inf]
+            for labels, (counts, total) in family["samples"]:
+                cumulative = 0
+                for bound, count in zip(bounds, counts):
+                    cumulative += count
+                    bucket_labels = _format_labels(labels, labels.values(), f'le="{_format_value(bound)}"')
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels, labels.values())} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels, labels.values())} {cumulative}")
+        else:
+            for labels, value in family["samples"]:
+                if value is None:
+                    continue
+                lines.append(f"{name}{_format_labels(labels, labels.values())} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def merge_families(snapshots):
+    """Combine the metrics of several processes, given as ``(worker, families, alive)``.
+
+    Counters and histograms are summed, including those of workers that
+    have exited, so totals never go backwards. Gauges describe a live
+    process and are kept per worker, with a ``worker`` label.
+    """
+    merged = {}
+    for worker, families, alive in snapshots:
+        for family in families:
+            kind = family["kind"]
+            if kind == "gauge" and not alive:
+                continue
+            target = merged.setdefault(family["name"], {**family, "samples": {}})["samples"]
+            for labels, value in family["samples"]:
+                if value is None:
+                    continue
+                if kind == "gauge":
+                    labels = {**labels, "worker": str(worker)}
+                key = tuple(labels.items())
+                known = target.get(key)
+                if known is not None and kind == "histogram":
+                    counts, total = known[1]
+                    value = [[mine + theirs for mine, theirs in zip(counts, value[0])], total + value[1]]
+                elif known is not None and kind == "counter":
+                    value = known[1] + value
+                target[key] = (labels, value)
+    return [{**family, "samples": list(family["samples"].values())} for family in merged.values()]
+
+
+ARCHIVE = "exited"
+
+
+def archive_worker(pid):
+    """Fold the last published metrics of an exited worker into the archive."""
+    path = worker_state.path_for(pid, "metrics")
+    families = worker_state.read_json(path)
+    if families is None:
+        return
+    archive_path = worker_state.path_for(ARCHIVE, "metrics")
+    archived = worker_state.read_json(archive_path) or []
+    worker_state.write_json(archive_path, merge_families([(ARCHIVE, archived, False), (pid, families, False)]))
+    os.unlink(path)
+
+
+class Registry:
+    """Metrics owned by this process plus collectors that are read at scrape time.
+
+    A collector returns ``(name, kind, help, samples)`` tuples where samples
+    are ``(labels_dict, value)`` pairs; it is how counters that other
+    modules already keep (cache hits, pool depth) are exported without
+    being counted twice.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.setdefault(metric.name, metric)
+        return self._metrics[metric.name]
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collect):
+        self._collectors.append(collect)
+
+    def collect(self):
+        families = [metric.collect() for metric in list(self._metrics.values())]
+        for collect in self._collectors:
+            for name, kind, help, samples in collect():
+                families.append({"name": name, "kind": kind, "help": help, "samples": samples})
+        return families
+
+    def publish(self):
+        worker_state.write_json(worker_state.path_for(os.getpid(), "metrics"), self.collect())
+
+    def expose(self):
+        """The registry in the Prometheus text exposition format.
+
+        In a pre-forking server this covers every worker, merged with
+        ``merge_families``; other workers' numbers are as of their last
+        publish.
+        """
+        families = self.collect()
+        if worker_state.shared_dir is not None:
+            snapshots = [(os.getpid(), families, True)]
+            for name, published in worker_state.read_published("metrics"):
+                snapshots.append((name, published, name != ARCHIVE))
+            families = merge_families(snapshots)
+        return _render(families)
+
+
+registry = Registry()
+worker_state.add_publisher(registry.publish)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,194 @@
+import os
+import sys
+import time
+import random
+import threading
+from collections import Counter
+from multiprocessing.sharedctypes import RawArray
+
+from src.core import worker_state
+
+CERT_PROFILER_INTERVAL_MS = float(os.environ.get("CERT_PROFILER_INTERVAL_MS", "5"))
+CERT_PROFILER_MAX_STACKS = int(os.environ.get("CERT_PROFILER_MAX_STACKS", "20000"))
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _collapse(frame, thread_name):
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Samples the stacks of every thread while a profiled request is running.
+
+    Off until ``configure`` sets a sample rate. Each request is then
+    profiled with that probability; while at least one is in flight a
+    background thread records all thread stacks every ``interval``
+    seconds, aggregated in the collapsed format flamegraph tools read
+    (``frame;frame;frame count``). Renders in worker processes show up as
+    the wait for their result, not as their own stacks.
+
+    After ``share``, the sample rate and resets live in shared memory, so
+    a setting made through any worker of a pre-forking server applies to
+    all of them, and ``collapsed`` and ``stats`` include the stacks the
+    other workers publish.
+    """
+
+    def __init__(self, interval=CERT_PROFILER_INTERVAL_MS / 1000, max_stacks=CERT_PROFILER_MAX_STACKS):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self._sample_rate = 0.0
+        self._shared = None
+        self._epoch = 0
+        self._published = None
+        self._stacks = Counter()
+        self._active = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread = None
+        self.requests = 0
+        self.samples = 0
+        self.dropped = 0
+
+    def share(self):
+        """Move the settings to shared memory; call before forking the workers."""
+        self._shared = RawArray('d', [self._sample_rate, self._epoch])
+
+    @property
+    def sample_rate(self):
+        return self._shared[0] if self._shared is not None else self._sample_rate
+
+    def configure(self, sample_rate):
+        sample_rate = min(max(sample_rate, 0.0), 1.0)
+        if self._shared is not None:
+            self._shared[0] = sample_rate
+        else:
+            self._sample_rate = sample_rate
+
+    def _follow_resets(self):
+        # Another worker reset the profiler since we last looked.
+        if self._shared is not None and self._shared[1] != self._epoch:
+            with self._lock:
+                self._clear()
+                self._epoch = self._shared[1]
+
+    def should_sample(self):
+        self._follow_resets()
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def begin(self):
+        with self._lock:
+            self._active += 1
+            self.requests += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="cert-profiler", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def end(self):
+        with self._lock:
+            self._active -= 1
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                while not self._active:
+                    self._wake.wait()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            collapsed = [
+                _collapse(frame, names.get(ident, f"thread-{ident}"))
+                for ident, frame in frames.items() if ident != me
+            ]
+            del frames
+            with self._lock:
+                for stack in collapsed:
+                    if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                        self._stacks[stack] += 1
+                    else:
+                        self.dropped += 1
+                self.samples += 1
+            time.sleep(self.interval)
+
+    def _snapshot(self):
+        with self._lock:
+            return {
+                "epoch": self._epoch,
+                "stacks": dict(self._stacks),
+                "requests": self.requests,
+                "samples": self.samples,
+                "dropped": self.dropped,
+            }
+
+    def publish(self):
+        self._follow_resets()
+        snapshot = self._snapshot()
+        version = (snapshot["epoch"], snapshot["requests"], snapshot["samples"])
+        if version != self._published:
+            worker_state.write_json(worker_state.path_for(os.getpid(), "profile"), snapshot)
+            self._published = version
+
+    def _snapshots(self):
+        """This process's samples and, when shared, those other workers published since the last reset."""
+        self._follow_resets()
+        snapshots = [self._snapshot()]
+        if worker_state.shared_dir is not None:
+            snapshots.extend(
+                published for _, published in worker_state.read_published("profile")
+                if published["epoch"] == snapshots[0]["epoch"]
+            )
+        return snapshots
+
+    def collapsed(self):
+        """Collected stacks, one ``stack count`` line each, most frequent first."""
+        stacks = Counter()
+        for snapshot in self._snapshots():
+            stacks.update(snapshot["stacks"])
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def _clear(self):
+        self._stacks.clear()
+        self.requests = 0
+        self.samples = 0
+        self.dropped = 0
+
+    def reset(self):
+        if self._shared is not None:
+            self._shared[1] += 1
+            self._follow_resets()
+            if worker_state.shared_dir is not None:
+                # Live workers republish on their next tick; exited ones are gone for good.
+                worker_state.remove_published("profile")
+        else:
+            with self._lock:
+                self._clear()
+
+    def stats(self):
+        snapshots = self._snapshots()
+        stacks = set()
+        for snapshot in snapshots:
+            stacks.update(snapshot["stacks"])
+        return {
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "profiled_requests": sum(snapshot["requests"] for snapshot in snapshots),
+            "active": self._active,
+            "samples": sum(snapshot["samples"] for snapshot in snapshots),
+            "distinct_stacks": len(stacks),
+            "dropped_stacks": sum(snapshot["dropped"] for snapshot in snapshots),
+            "workers": len(snapshots),
+        }
+
+
+profiler = SamplingProfiler()
+worker_state.add_publisher(profiler.publish)
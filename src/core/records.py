@@ -0,0 +1,91 @@
+import os
+import threading
+
+CERT_RECORD_DICTIONARY_SIZE = int(os.environ.get("CERT_RECORD_DICTIONARY_SIZE", "100000"))
+
+# Fields whose values repeat across certificates: a cohort shares its
+# course, date, instructors, organization, place and template.
+ENCODED_FIELDS = (
+    "course_name",
+    "issue_date",
+    "instructor",
+    "instructor_title",
+    "co_instructor",
+    "co_instructor_title",
+    "organization",
+    "place",
+    "certification_type",
+    "hours",
+    "template",
+)
+
+UNIQUE_FIELDS = ("id", "verification_code", "student_name", "timestamp")
+
+RECORD_FIELDS = UNIQUE_FIELDS + ENCODED_FIELDS
+
+_FIELD_SET = frozenset(RECORD_FIELDS)
+
+
+class FieldDictionary:
+    """Process-wide dictionary of repeated field values.
+
+    Every distinct value is kept once and records point at that copy, so a
+    million certificates of the same course hold one ``course_name`` string.
+    Past ``max_values`` distinct values new ones are stored unshared.
+    """
+
+    def __init__(self, max_values=CERT_RECORD_DICTIONARY_SIZE):
+        self.max_values = max_values
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def encode(self, value):
+        shared = self._values.get(value)
+        if shared is not None:
+            return shared
+        if not isinstance(value, str) or len(self._values) >= self.max_values:
+            return value
+        with self._lock:
+            return self._values.setdefault(value, value)
+
+    def __len__(self):
+        return len(self._values)
+
+
+field_dictionary = FieldDictionary()
+
+
+class CertificateRecord:
+    """Compact, read-only form of a stored certificate.
+
+    Missing fields are None and are left out again by ``to_dict``; fields
+    this class doesn't know about are kept in ``extra``.
+    """
+
+    __slots__ = RECORD_FIELDS + ("extra",)
+
+    @classmethod
+    def from_dict(cls, data):
+        record = cls.__new__(cls)
+        for field in UNIQUE_FIELDS:
+            setattr(record, field, data.get(field))
+        encode = field_dictionary.encode
+        for field in ENCODED_FIELDS:
+            value = data.get(field)
+            setattr(record, field, encode(value) if value is not None else None)
+        extra = {key: value for key, value in data.items() if key not in _FIELD_SET}
+        record.extra = extra or None
+        return record
+
+    def to_dict(self):
+        data = {}
+        for field in RECORD_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"CertificateRecord(id={self.id!r})"
@@ -0,0 +1,243 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.core.assets import preload_assets
+from src.core.certificate_renderer import render_certificate_pdf, render_cohort_pdf, render_phase_seconds
+from src.core.metrics import registry
+from src.core.request_timer import current_timer, record_phase, start_timer, stop_timer
+
+CERT_RENDER_WORKERS = int(os.environ.get("CERT_RENDER_WORKERS", str(os.cpu_count() or 1)))
+CERT_RENDER_QUEUE_DEPTH = int(os.environ.get("CERT_RENDER_QUEUE_DEPTH", "32"))
+CERT_RENDER_RETRY_AFTER = int(os.environ.get("CERT_RENDER_RETRY_AFTER", "2"))
+
+
+class RenderPoolSaturated(Exception):
+    pass
+
+
+render_wait_seconds = registry.histogram(
+    "cert_render_queue_wait_seconds",
+    "Time a render waited for a free worker.",
+    ("kind",)
+)
+render_seconds = registry.histogram(
+    "cert_render_seconds",
+    "Time a worker spent on a render.",
+    ("kind",)
+)
+
+_in_worker = False
+
+
+def _warm_worker():
+    global _in_worker
+    _in_worker = True
+    preload_assets()
+
+
+def _noop():
+    return None
+
+
+def _in_process(render, *args):
+    # Timings taken in a worker process are sent back with the result: the
+    # drained histogram for /metrics and this render's phases for the
+    # request's Server-Timing. In-thread renders record both directly.
+    started = time.time()
+    if not _in_worker:
+        return started, render(*args), [], []
+    timer, token = start_timer()
+    try:
+        result = render(*args)
+    finally:
+        stop_timer(token)
+    return started, result, render_phase_seconds.drain(), list(timer.phases.items())
+
+
+def _render_in_worker(cert_data):
+    return _in_process(render_certificate_pdf, cert_data)
+
+
+def _render_cohort_in_worker(records, output_path):
+    return _in_process(render_cohort_pdf, records, output_path)
+
+
+class RenderPool:
+    """Runs PDF renders off the event loop with a bounded number in flight.
+
+    With ``workers > 0`` renders go to a process pool whose workers preload
+    fonts and the watermark when they start; with ``workers == 0`` they run
+    in a thread of the current process. Once ``max_pending`` renders are
+    queued or running, new ones fail fast with RenderPoolSaturated.
+
+    If a worker process dies (the OOM killer, a crash in native code) the
+    process pool is unusable from then on; the first render to notice
+    replaces it, not ready until the new workers are up, and every render
+    that hit the broken pool is retried once on the new one.
+    """
+
+    def __init__(self, workers=CERT_RENDER_WORKERS, max_pending=CERT_RENDER_QUEUE_DEPTH):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self.ready = False
+        self.pending = 0
+        self.max_pending_seen = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_render = 0.0
+
+    def _ensure_executor_locked(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        return self._executor
+
+    def _ensure_executor(self):
+        with self._lock:
+            return self._ensure_executor_locked()
+
+    def _warm_up(self, executor):
+        # Worker processes are spawned on demand; submitting one task per
+        # worker brings them all up (and through the initializer) now.
+        for future in [executor.submit(_noop) for _ in range(self.workers)]:
+            future.result()
+
+    def start(self):
+        if self.workers > 0:
+            self._warm_up(self._ensure_executor())
+        self.ready = True
+
+    def _replace_executor(self, broken):
+        """Swap a broken process pool for a new one, unless another render already did."""
+        with self._lock:
+            if self._executor is not broken:
+                return self._ensure_executor_locked()
+            self.ready = False
+            self.restarts += 1
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            executor = self._ensure_executor_locked()
+        self._warm_up(executor)
+        self.ready = True
+        return executor
+
+    def shutdown(self):
+        self.ready = False
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _acquire(self, count_rejection=True):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                if count_rejection:
+                    self.rejected += 1
+                raise RenderPoolSaturated()
+            self.pending += 1
+            self.max_pending_seen = max(self.max_pending_seen, self.pending)
+
+    async def _wait_for_slot(self):
+        while True:
+            try:
+                self._acquire(count_rejection=False)
+                return
+            except RenderPoolSaturated:
+                await asyncio.sleep(0.05)
+
+    def _release(self, wait, render, ok):
+        with self._lock:
+            self.pending -= 1
+            if ok:
+                self.completed += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self.total_render += render
+            else:
+                self.failed += 1
+
+    async def render(self, cert_data, block=False):
+        """Render ``cert_data`` to PDF bytes.
+
+        Interactive requests fail fast when the pool is saturated; bulk
+        callers pass ``block=True`` to wait for a free slot instead.
+        """
+        return await self._run("certificate", _render_in_worker, (cert_data,), block)
+
+    async def render_cohort(self, records, output_path, block=False):
+        """Render ``records`` as one multi-page PDF written to ``output_path``."""
+        return await self._run("cohort", _render_cohort_in_worker, (records, output_path), block)
+
+    async def _run(self, kind, func, args, block):
+        if block:
+            await self._wait_for_slot()
+        else:
+            self._acquire()
+        submitted = time.time()
+        wait = render = 0.0
+        ok = False
+        try:
+            loop = asyncio.get_running_loop()
+            if self.workers > 0:
+                executor = self._ensure_executor()
+                try:
+                    outcome = await loop.run_in_executor(executor, func, *args)
+                except BrokenProcessPool:
+                    executor = await asyncio.to_thread(self._replace_executor, executor)
+                    outcome = await loop.run_in_executor(executor, func, *args)
+                started, result, phases, request_phases = outcome
+            else:
+                started, result, phases, request_phases = await asyncio.to_thread(func, *args)
+            finished = time.time()
+            wait = max(started - submitted, 0.0)
+            render = finished - started
+            ok = True
+            render_phase_seconds.merge(phases)
+            timer = current_timer()
+            if timer is not None:
+                timer.merge(request_phases)
+            record_phase("render_queue", wait)
+            render_wait_seconds.observe(wait, kind)
+            render_seconds.observe(render, kind)
+            return result
+        finally:
+            self._release(wait, render, ok)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_depth": self.pending,
+            "max_queue_depth": self.max_pending,
+            "peak_queue_depth": self.max_pending_seen,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "avg_wait_seconds": self.total_wait / self.completed if self.completed else 0.0,
+            "max_wait_seconds": self.max_wait,
+            "avg_render_seconds": self.total_render / self.completed if self.completed else 0.0,
+        }
+
+
+render_pool = RenderPool()
+
+
+def _collect_render_pool():
+    stats = render_pool.stats()
+    yield "cert_render_pool_workers", "gauge", "Render worker processes.", [({}, stats["workers"])]
+    yield "cert_render_queue_depth", "gauge", "Renders queued or running.", [({}, stats["queue_depth"])]
+    yield "cert_render_queue_limit", "gauge", "Renders allowed in flight before new ones are rejected.", [({}, stats["max_queue_depth"])]
+    yield "cert_render_rejected_total", "counter", "Renders rejected because the queue was full.", [({}, stats["rejected"])]
+    yield "cert_render_failed_total", "counter", "Renders that raised an error.", [({}, stats["failed"])]
+    yield "cert_render_pool_restarts_total", "counter", "Process pools replaced after a worker died.", [({}, stats["restarts"])]
+
+
+registry.add_collector(_collect_render_pool)
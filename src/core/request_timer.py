@@ -0,0 +1,66 @@
+import time
+import contextvars
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    """Time spent per phase while handling one request.
+
+    Phases that happen more than once (two storage loads, say) add up.
+    """
+
+    __slots__ = ("started", "phases")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def merge(self, phases):
+        for name, seconds in phases:
+            self.add(name, seconds)
+
+    def server_timing(self, total=None):
+        """The phases as a ``Server-Timing`` header value, in milliseconds."""
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        if total is not None:
+            entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+def start_timer():
+    """Give the current context (a request) a fresh timer; returns it and a reset token."""
+    timer = RequestTimer()
+    return timer, _current.set(timer)
+
+
+def stop_timer(token):
+    _current.reset(token)
+
+
+def current_timer():
+    return _current.get()
+
+
+def record_phase(name, seconds):
+    """Add ``seconds`` to phase ``name`` of the current request, if it is being timed."""
+    timer = _current.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+@contextmanager
+def phase(name):
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
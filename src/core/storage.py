@@ -0,0 +1,857 @@
+import os
+import re
+import json
+import time
+import fcntl
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future
+
+from src.core.metrics import registry
+
+CERT_DB_GROUP_COMMIT_MS = float(os.environ.get("CERT_DB_GROUP_COMMIT_MS", "5"))
+CERT_LOG_COMPACT_BYTES = int(os.environ.get("CERT_LOG_COMPACT_BYTES", str(64 * 1024 * 1024)))
+
+
+storage_seconds = registry.histogram(
+    "cert_storage_operation_seconds",
+    "Time spent loading records from and saving records to the certificate storage.",
+    ("backend", "operation")
+)
+
+
+class StorageError(Exception):
+    pass
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive advisory lock on ``path`` across processes."""
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write(path, write, binary=False):
+    """Write a file through a fsync'd temporary file renamed over ``path``."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb' if binary else 'w') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    _fsync_directory(directory)
+
+
+def _fsync_directory(directory):
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class GroupCommitter:
+    """Coalesces concurrent writes into a single call of ``flush``.
+
+    The first writer to arrive becomes the leader: it waits ``window``
+    seconds for others to queue their records, then flushes everything
+    queued in one go (repeating while more arrived meanwhile). Every caller
+    returns once its own records are durable, or raises the flush error.
+    When ``flush`` returns a list with one result per record, each caller
+    gets the part of it for its own records.
+    """
+
+    def __init__(self, flush, window):
+        self.flush = flush
+        self.window = window
+        self._pending = []
+        self._lock = threading.Lock()
+        self._leader_active = False
+        self.commits = 0
+        self.records = 0
+
+    def submit(self, records):
+        future = Future()
+        with self._lock:
+            self._pending.append((records, future))
+            leader = not self._leader_active
+            self._leader_active = True
+
+        if leader:
+            if self.window > 0:
+                time.sleep(self.window)
+            self._drain()
+
+        return future.result()
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                if not batch:
+                    self._leader_active = False
+                    return
+
+            records = [record for batch_records, _ in batch for record in batch_records]
+            try:
+                results = self.flush(records)
+            except BaseException as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                self.commits += 1
+                self.records += len(records)
+                start = 0
+                for batch_records, future in batch:
+                    end = start + len(batch_records)
+                    future.set_result(results[start:end] if results is not None else None)
+                    start = end
+
+
+class WriteNotifier:
+    """Tells listeners about this process's writes to a storage.
+
+    Backends report every write with the ``generation()`` just before and
+    just after it, both taken while holding the writer lock, so nothing
+    else can have changed in between: a listener whose view matches
+    ``before`` can apply the write and move on to ``after`` instead of
+    reloading everything. ``writes_in_flight`` is non-zero while a write
+    may already be visible but not yet reported.
+    """
+
+    def __init__(self):
+        self.write_listeners = []
+        self.writes_in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+    @contextmanager
+    def _writing(self):
+        with self._in_flight_lock:
+            self.writes_in_flight += 1
+        try:
+            yield
+        finally:
+            with self._in_flight_lock:
+                self.writes_in_flight -= 1
+
+    def _written(self, records, before, after):
+        cert_ids = [record['id'] for record in records]
+        for listener in self.write_listeners:
+            listener(self, cert_ids, before, after)
+
+
+class JSONStorage(WriteNotifier):
+    """Whole-file JSON store, kept for small installs and as the migration source.
+
+    Writers serialize on ``<db_file>.lock`` across processes and replace the
+    file atomically, so readers never need the lock and never see a partial
+    file. Concurrent inserts in one process share a single rewrite.
+    """
+
+    name = "json"
+
+    def __init__(self, db_file, group_commit_window=CERT_DB_GROUP_COMMIT_MS / 1000):
+        super().__init__()
+        self.db_file = db_file
+        self.lock_file = db_file + ".lock"
+        self._writes = 0
+        self._committer = GroupCommitter(self._write, group_commit_window)
+        self._inserter = GroupCommitter(self._write_new, group_commit_window)
+
+    def _load_db(self):
+        if not os.path.exists(self.db_file):
+            return {}
+        try:
+            with open(self.db_file, 'r') as f:
+                return json.load(f)
+        except json.JSONDecodeError as e:
+            raise StorageError(f"Certificate database {self.db_file} is corrupted: {e}")
+
+    def _save_db(self, data):
+        atomic_write(self.db_file, lambda f: json.dump(data, f, indent=2))
+        self._writes += 1
+
+    def _make_directory(self):
+        directory = os.path.dirname(self.db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _write(self, records):
+        self._make_directory()
+        with self._writing(), file_lock(self.lock_file):
+            before = self.generation()
+            all_certs = self._load_db()
+            for cert_data in records:
+                all_certs[cert_data['id']] = cert_data
+            self._save_db(all_certs)
+            self._written(records, before, self.generation())
+
+    def _write_new(self, records):
+        self._make_directory()
+        with self._writing(), file_lock(self.lock_file):
+            before = self.generation()
+            all_certs = self._load_db()
+            existing = []
+            new = []
+            for cert_data in records:
+                stored = all_certs.get(cert_data['id'])
+                if stored is None:
+                    all_certs[cert_data['id']] = cert_data
+                    new.append(cert_data)
+                existing.append(stored)
+            if new:
+                self._save_db(all_certs)
+                self._written(new, before, self.generation())
+            return existing
+
+    def exists(self):
+        return os.path.exists(self.db_file)
+
+    def generation(self):
+        return (self._writes, _file_signature(self.db_file))
+
+    def get(self, cert_id):
+        return self._load_db().get(cert_id)
+
+    def get_many(self, cert_ids):
+        all_certs = self._load_db()
+        return {cert_id: all_certs[cert_id] for cert_id in cert_ids if cert_id in all_certs}
+
+    def put(self, cert_data):
+        self.put_many([cert_data])
+
+    def put_many(self, records):
+        self._committer.submit(list(records))
+
+    def insert_many(self, records):
+        """Store the records whose id is not taken yet.
+
+        Returns, in order, None for each record stored and the record that
+        already holds the id for the others, read under the same lock.
+        """
+        return self._inserter.submit(list(records))
+
+    def iter_records(self):
+        return iter(self._load_db().values())
+
+    def iter_ids(self):
+        return iter(self._load_db())
+
+    def count(self):
+        return len(self._load_db())
+
+    def size_bytes(self):
+        return _file_size(self.db_file)
+
+
+class SQLiteStorage(WriteNotifier):
+    """SQLite store in WAL mode with a primary-key index on the certificate id.
+
+    Records are kept as JSON documents next to the indexed id so new
+    certificate fields don't need a schema change.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_file, migrate_from=None):
+        super().__init__()
+        self.db_file = db_file
+        self._local = threading.local()
+        # Keeps this process's commits and their reports in the same order.
+        self._write_lock = threading.Lock()
+        # A connection must not be used across fork(): children of a
+        # pre-forking server open their own.
+        os.register_at_fork(after_in_child=self._forget_connections)
+        self._init_schema(migrate_from)
+
+    def _forget_connections(self):
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self, migrate_from):
+        directory = os.path.dirname(self.db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS certificates ("
+                " id TEXT PRIMARY KEY,"
+                " verification_code TEXT NOT NULL,"
+                " data TEXT NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID"
+            )
+            migrated = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+            if migrated is None:
+                if migrate_from and os.path.exists(migrate_from):
+                    self._insert(conn, JSONStorage(migrate_from).iter_records())
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('migrated_from', ?)",
+                    (migrate_from or "",)
+                )
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', '0')")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _insert(self, conn, records):
+        conn.executemany(
+            "INSERT OR REPLACE INTO certificates (id, verification_code, data) VALUES (?, ?, ?)",
+            ((r['id'], r['verification_code'], json.dumps(r)) for r in records)
+        )
+
+    def exists(self):
+        return os.path.exists(self.db_file)
+
+    def _bump_generation(self, conn):
+        # Inside a write transaction, so no other commit can come between.
+        before = self._generation(conn)
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (str(before + 1),))
+        return before, before + 1
+
+    def _generation(self, conn):
+        return int(conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+
+    def generation(self):
+        # Every write transaction, from any process, bumps the counter.
+        return self._generation(self._connect())
+
+    def get(self, cert_id):
+        row = self._connect().execute(
+            "SELECT data FROM certificates WHERE id = ?", (cert_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, cert_ids):
+        conn = self._connect()
+        unique_ids = list(dict.fromkeys(cert_ids))
+        found = {}
+        # Stay below SQLite's default limit on bound parameters per statement.
+        for start in range(0, len(unique_ids), 500):
+            chunk = unique_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT id, data FROM certificates WHERE id IN ({placeholders})", chunk
+            )
+            for cert_id, data in rows:
+                found[cert_id] = json.loads(data)
+        return found
+
+    def put(self, cert_data):
+        self.put_many([cert_data])
+
+    def put_many(self, records):
+        records = list(records)
+        conn = self._connect()
+        with self._writing(), self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                before, after = self._bump_generation(conn)
+                self._insert(conn, records)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._written(records, before, after)
+
+    def insert_many(self, records):
+        """Store the records whose id is not taken yet; see ``JSONStorage.insert_many``."""
+        conn = self._connect()
+        existing = []
+        new = []
+        with self._writing(), self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                before, after = self._bump_generation(conn)
+                for r in records:
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO certificates (id, verification_code, data) VALUES (?, ?, ?)",
+                        (r['id'], r['verification_code'], json.dumps(r))
+                    )
+                    if cursor.rowcount:
+                        existing.append(None)
+                        new.append(r)
+                    else:
+                        row = conn.execute("SELECT data FROM certificates WHERE id = ?", (r['id'],)).fetchone()
+                        existing.append(json.loads(row[0]))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._written(new, before, after)
+        return existing
+
+    def iter_records(self):
+        for (data,) in self._connect().execute("SELECT data FROM certificates ORDER BY id"):
+            yield json.loads(data)
+
+    def iter_ids(self):
+        for (cert_id,) in self._connect().execute("SELECT id FROM certificates"):
+            yield cert_id
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM certificates").fetchone()[0]
+
+    def size_bytes(self):
+        return _file_size(self.db_file) + _file_size(self.db_file + "-wal")
+
+
+class LogStorage(WriteNotifier):
+    """Append-only store made of log segments and compacted snapshots.
+
+    Every insert is one fsync'd append of a JSON line to the newest segment
+    ``<base>.log.N``, and lookups go through an in-memory index of
+    ``id -> (file, offset, length)``. Once the segments outgrow
+    ``compact_bytes`` a background thread starts a new segment and folds the
+    older ones, together with the previous snapshot, into
+    ``<base>.snapshot.N`` plus its index file. On start the snapshot index is
+    loaded as is and only the segments written after it are replayed.
+    """
+
+    name = "log"
+
+    def __init__(self, base_path, compact_bytes=CERT_LOG_COMPACT_BYTES,
+                 group_commit_window=CERT_DB_GROUP_COMMIT_MS / 1000, migrate_from=None):
+        super().__init__()
+        self.base_path = base_path
+        self.directory = os.path.dirname(os.path.abspath(base_path))
+        self.lock_file = base_path + ".lock"
+        self.compact_lock_file = base_path + ".compact.lock"
+        self.compact_bytes = compact_bytes
+        self.compactions = 0
+        self._name_pattern = re.compile(re.escape(os.path.basename(base_path)) + r"\.(log|snapshot)\.(\d{8})$")
+        self._lock = threading.RLock()
+        self._index = {}
+        self._positions = {}
+        self._fds = {}
+        self._snapshot = None
+        self._version = 0
+        self._compactor = None
+        self._committer = GroupCommitter(self._append, group_commit_window)
+        self._inserter = GroupCommitter(self._append_new, group_commit_window)
+
+        os.makedirs(self.directory, exist_ok=True)
+        if migrate_from:
+            self._migrate(migrate_from)
+        self._refresh()
+
+    def _path(self, kind, number):
+        return f"{self.base_path}.{kind}.{number:08d}"
+
+    def _files(self):
+        found = {"log": [], "snapshot": []}
+        for name in os.listdir(self.directory):
+            match = self._name_pattern.match(name)
+            if match:
+                found[match.group(1)].append(int(match.group(2)))
+        return sorted(found["log"]), sorted(found["snapshot"])
+
+    def _fd(self, path):
+        fd = self._fds.get(path)
+        if fd is None:
+            fd = self._fds[path] = os.open(path, os.O_RDONLY)
+        return fd
+
+    def _read(self, entry):
+        path, offset, length = entry
+        return os.pread(self._fd(path), length, offset)
+
+    def _refresh(self, retry=True):
+        """Catch up with snapshots and appends made by this or other processes."""
+        with self._lock:
+            segments, snapshots = self._files()
+            snapshot = snapshots[-1] if snapshots else 0
+            if snapshot != self._snapshot:
+                self._load_snapshot(snapshot)
+            try:
+                for segment in segments:
+                    if segment > snapshot:
+                        self._replay(segment)
+            except FileNotFoundError:
+                # Folded into a snapshot and removed since the directory was
+                # listed; that snapshot is visible now.
+                if not retry:
+                    raise
+                self._refresh(retry=False)
+
+    def _load_snapshot(self, number):
+        index = {}
+        if number:
+            path = self._path("snapshot", number)
+            with open(path + ".idx", 'r') as f:
+                for line in f:
+                    cert_id, offset, length = line.rstrip("\n").split("\t")
+                    index[cert_id] = (path, int(offset), int(length))
+
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+        self._index = index
+        self._positions = {}
+        self._snapshot = number
+        self._version += 1
+
+    def _replay(self, segment):
+        path = self._path("log", segment)
+        fd = self._fd(path)
+        position = self._positions.get(segment, 0)
+        size = os.fstat(fd).st_size
+        if size <= position:
+            return
+
+        data = os.pread(fd, size - position, position)
+        # Only whole lines: a writer in another process may be mid-append.
+        end = data.rfind(b"\n") + 1
+        offset = position
+        for line in data[:end].splitlines(keepends=True):
+            try:
+                cert_id = json.loads(line)["id"]
+            except (ValueError, KeyError, TypeError):
+                # Torn append from a writer that crashed; skipped for good.
+                pass
+            else:
+                self._index[cert_id] = (path, offset, len(line))
+            offset += len(line)
+        if end:
+            self._positions[segment] = position + end
+            self._version += 1
+
+    def _log_bytes(self):
+        return sum(self._positions.values())
+
+    def _write_segment(self, records):
+        # Caller holds the cross-process lock.
+        segments, snapshots = self._files()
+        if segments:
+            segment = segments[-1]
+        else:
+            segment = (snapshots[-1] if snapshots else 0) + 1
+        path = self._path("log", segment)
+        created = not os.path.exists(path)
+
+        data = b"".join(json.dumps(record).encode() + b"\n" for record in records)
+        fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b"\n":
+                data = b"\n" + data
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        if created:
+            _fsync_directory(self.directory)
+
+    def _append(self, records):
+        with self._writing(), file_lock(self.lock_file):
+            before = self.generation()
+            self._write_segment(records)
+            self._written(records, before, self.generation())
+        self._maybe_compact()
+
+    def _append_new(self, records):
+        existing = []
+        new = {}
+        with self._writing(), file_lock(self.lock_file):
+            # Appends from other processes are only seen once replayed.
+            before = self.generation()
+            with self._lock:
+                for record in records:
+                    stored = new.get(record['id'])
+                    if stored is None:
+                        entry = self._index.get(record['id'])
+                        if entry is not None:
+                            stored = json.loads(self._read(entry))
+                    if stored is None:
+                        new[record['id']] = record
+                    existing.append(stored)
+            if new:
+                self._write_segment(list(new.values()))
+                self._written(list(new.values()), before, self.generation())
+        if new:
+            self._maybe_compact()
+        return existing
+
+    def _migrate(self, json_file):
+        with file_lock(self.lock_file):
+            segments, snapshots = self._files()
+            if segments or snapshots:
+                return
+            # An empty first segment still marks the migration as done.
+            records = list(JSONStorage(json_file).iter_records()) if os.path.exists(json_file) else []
+            self._write_segment(records)
+
+    def _maybe_compact(self):
+        if self.compact_bytes <= 0 or self._log_bytes() < self.compact_bytes:
+            return
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, name="cert-log-compactor", daemon=True)
+            self._compactor.start()
+
+    def compact(self):
+        """Fold the current snapshot and all finished segments into a new snapshot.
+
+        Returns False when there is nothing to fold or another process is
+        already compacting.
+        """
+        with open(self.compact_lock_file, 'a') as compact_lock:
+            try:
+                fcntl.flock(compact_lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+
+            with file_lock(self.lock_file):
+                segments, _ = self._files()
+                if not any(os.path.getsize(self._path("log", segment)) for segment in segments):
+                    return False
+                folded = segments[-1]
+                # Appends go to a fresh segment while the old ones are folded.
+                open(self._path("log", folded + 1), 'ab').close()
+                _fsync_directory(self.directory)
+
+            self._refresh()
+            with self._lock:
+                entries = sorted(self._index.items())
+
+            path = self._path("snapshot", folded)
+            with open(path + ".tmp", 'wb') as data_file, open(path + ".idx.tmp", 'w') as index_file:
+                offset = 0
+                for cert_id, entry in entries:
+                    with self._lock:
+                        line = self._read(entry)
+                    data_file.write(line)
+                    index_file.write(f"{cert_id}\t{offset}\t{len(line)}\n")
+                    offset += len(line)
+                for f in (data_file, index_file):
+                    f.flush()
+                    os.fsync(f.fileno())
+            # The data file appearing is what makes the snapshot visible.
+            os.replace(path + ".idx.tmp", path + ".idx")
+            os.replace(path + ".tmp", path)
+            _fsync_directory(self.directory)
+
+            with file_lock(self.lock_file):
+                segments, snapshots = self._files()
+                for segment in segments:
+                    if segment <= folded:
+                        os.unlink(self._path("log", segment))
+                for snapshot in snapshots:
+                    if snapshot < folded:
+                        os.unlink(self._path("snapshot", snapshot))
+                        os.unlink(self._path("snapshot", snapshot) + ".idx")
+
+            self._refresh()
+            self.compactions += 1
+            return True
+
+    def exists(self):
+        segments, snapshots = self._files()
+        return bool(segments or snapshots)
+
+    def generation(self):
+        self._refresh()
+        return self._version
+
+    def get(self, cert_id):
+        self._refresh()
+        with self._lock:
+            entry = self._index.get(cert_id)
+            if entry is None:
+                return None
+            line = self._read(entry)
+        return json.loads(line)
+
+    def get_many(self, cert_ids):
+        self._refresh()
+        lines = {}
+        with self._lock:
+            for cert_id in cert_ids:
+                entry = self._index.get(cert_id)
+                if entry is not None:
+                    lines[cert_id] = self._read(entry)
+        return {cert_id: json.loads(line) for cert_id, line in lines.items()}
+
+    def put(self, cert_data):
+        self.put_many([cert_data])
+
+    def put_many(self, records):
+        self._committer.submit(list(records))
+
+    def insert_many(self, records):
+        """Store the records whose id is not taken yet; see ``JSONStorage.insert_many``."""
+        return self._inserter.submit(list(records))
+
+    def iter_records(self):
+        self._refresh()
+        with self._lock:
+            entries = sorted(self._index.items())
+        for _, entry in entries:
+            with self._lock:
+                line = self._read(entry)
+            yield json.loads(line)
+
+    def iter_ids(self):
+        self._refresh()
+        with self._lock:
+            return iter(list(self._index))
+
+    def count(self):
+        self._refresh()
+        return len(self._index)
+
+    def size_bytes(self):
+        segments, snapshots = self._files()
+        total = sum(_file_size(self._path("log", number)) for number in segments)
+        for number in snapshots:
+            path = self._path("snapshot", number)
+            total += _file_size(path) + _file_size(path + ".idx")
+        return total
+
+
+def sqlite_path_for(db_file):
+    root, ext = os.path.splitext(db_file)
+    return root + ".sqlite3" if ext == ".json" else db_file
+
+
+def log_path_for(db_file):
+    root, ext = os.path.splitext(db_file)
+    return root if ext == ".json" else db_file
+
+
+def migrate_json_to_sqlite(json_file, sqlite_file=None):
+    """Import a legacy certificates_db.json into SQLite. Safe to run more than once."""
+    sqlite_file = sqlite_file or sqlite_path_for(json_file)
+    storage = SQLiteStorage(sqlite_file)
+    storage.put_many(JSONStorage(json_file).iter_records())
+    return storage
+
+
+BACKENDS = ("json", "sqlite", "log", "snapshot")
+
+_storages = {}
+_storages_lock = threading.Lock()
+
+
+def open_storage(db_file, backend="json"):
+    """Return the process-wide storage instance for ``db_file``.
+
+    With the sqlite and log backends a ``.json`` path is treated as the
+    legacy database: the new files are created next to it and seeded from
+    it once. The snapshot backend serves a file written by
+    ``src.core.validation_snapshot`` and is read-only.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown certificate storage backend: {backend}")
+
+    key = (backend, os.path.abspath(db_file))
+    with _storages_lock:
+        storage = _storages.get(key)
+        if storage is None:
+            if backend == "sqlite":
+                sqlite_file = sqlite_path_for(db_file)
+                legacy = db_file if sqlite_file != db_file else None
+                storage = SQLiteStorage(sqlite_file, migrate_from=legacy)
+            elif backend == "log":
+                base_path = log_path_for(db_file)
+                legacy = db_file if base_path != db_file else None
+                storage = LogStorage(base_path, migrate_from=legacy)
+            elif backend == "snapshot":
+                from src.core.validation_snapshot import ValidationSnapshot
+                storage = ValidationSnapshot(db_file)
+            else:
+                storage = JSONStorage(db_file)
+            _storages[key] = storage
+        return storage
+
+
+_counts = {}
+
+
+def _cached_count(key, storage):
+    # Counting reads the whole JSON file or scans the SQLite table; between
+    # writes the answer can't change.
+    if not storage.exists():
+        return 0
+    generation = storage.generation()
+    cached = _counts.get(key)
+    if cached is None or cached[0] != generation:
+        cached = _counts[key] = (generation, storage.count())
+    return cached[1]
+
+
+def _collect_storage():
+    with _storages_lock:
+        storages = list(_storages.items())
+    records = []
+    sizes = []
+    for key, storage in storages:
+        backend, path = key
+        labels = {"backend": backend, "path": path}
+        try:
+            records.append((labels, _cached_count(key, storage)))
+            sizes.append((labels, storage.size_bytes()))
+        except (StorageError, OSError):
+            continue
+    yield "cert_storage_records", "gauge", "Certificates in the storage.", records
+    yield "cert_storage_size_bytes", "gauge", "Bytes the storage occupies on disk.", sizes
+
+
+registry.add_collector(_collect_storage)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migrate a JSON certificate database to SQLite")
+    parser.add_argument("json_file")
+    parser.add_argument("sqlite_file", nargs="?")
+    args = parser.parse_args()
+
+    migrated = migrate_json_to_sqlite(args.json_file, args.sqlite_file)
+    print(f"Migrated {migrated.count()} certificates to {migrated.db_file}")
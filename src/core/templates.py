@@ -0,0 +1,402 @@
+"""Declarative certificate layouts.
+
+A template is a JSON file in ``CERT_TEMPLATES_DIR`` (``assets/templates`` by
+default) named after its ID. It describes a static ``background``, the
+variable ``content`` drawn per certificate and an ``overlay`` drawn on top
+with transparency. Coordinates may be arithmetic on ``page_width``,
+``page_height`` and the template's ``vars``; text may reference record
+fields as ``{field}``.
+
+Compiling a template evaluates every coordinate, resolves fonts, colours
+and the position of constant text once, and turns the static layers into
+PDF form XObjects, so a render only measures and places the variable text.
+Compiled templates are cached per ID for the life of the process. ReportLab
+is only imported once a template is compiled; reading specs doesn't need it.
+"""
+import os
+import re
+import ast
+import copy
+import json
+import string
+import operator
+import threading
+
+from src.core.assets import ASSETS_DIR, get_asset, register_asset
+
+TEMPLATES_DIR = os.environ.get("CERT_TEMPLATES_DIR", os.path.join(ASSETS_DIR, "templates"))
+DEFAULT_TEMPLATE = os.environ.get("CERT_DEFAULT_TEMPLATE", "default")
+
+# Names in reportlab.lib.pagesizes.
+PAGE_SIZES = {"letter": "letter", "a4": "A4"}
+ORIENTATIONS = ("landscape", "portrait")
+
+_TEMPLATE_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+_formatter = string.Formatter()
+
+_specs = {}
+_compiled = {}
+_lock = threading.Lock()
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class _Values(dict):
+    def __missing__(self, key):
+        return ""
+
+
+def load_template_spec(template_id=None):
+    """Return the parsed JSON of a template, read once per process."""
+    template_id = template_id or DEFAULT_TEMPLATE
+    spec = _specs.get(template_id)
+    if spec is not None:
+        return spec
+    if not _TEMPLATE_ID.match(template_id):
+        raise TemplateError(f"Invalid template ID: {template_id!r}")
+
+    path = os.path.join(TEMPLATES_DIR, template_id + ".json")
+    try:
+        with open(path, 'r') as f:
+            spec = json.load(f)
+    except FileNotFoundError:
+        raise TemplateError(f"Unknown certificate template: {template_id}")
+    except json.JSONDecodeError as e:
+        raise TemplateError(f"Certificate template {template_id} is not valid JSON: {e}")
+    _specs[template_id] = spec
+    return spec
+
+
+def template_exists(template_id):
+    try:
+        load_template_spec(template_id)
+    except TemplateError:
+        return False
+    return True
+
+
+def template_version(template_id=None):
+    template_id = template_id or DEFAULT_TEMPLATE
+    return f"{template_id}:{load_template_spec(template_id).get('version', '1')}"
+
+
+def get_template(template_id=None):
+    template_id = template_id or DEFAULT_TEMPLATE
+    try:
+        return _compiled[template_id]
+    except KeyError:
+        pass
+    with _lock:
+        if template_id not in _compiled:
+            _compiled[template_id] = CompiledTemplate(template_id, load_template_spec(template_id))
+        return _compiled[template_id]
+
+
+def preload_templates():
+    """Compile every template in TEMPLATES_DIR now instead of on first use."""
+    for name in sorted(os.listdir(TEMPLATES_DIR)):
+        template_id, ext = os.path.splitext(name)
+        if ext == ".json" and _TEMPLATE_ID.match(template_id):
+            get_template(template_id)
+
+
+def evaluate(expression, names):
+    """Evaluate a number or an arithmetic expression over ``names``."""
+    if isinstance(expression, (int, float)):
+        return expression
+
+    def walk(node):
+        if isinstance(node, ast.Expression):
+            return walk(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.Name) and node.id in names:
+            return names[node.id]
+        if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+            return _OPERATORS[type(node.op)](walk(node.left), walk(node.right))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -walk(node.operand)
+        raise TemplateError(f"Unsupported template expression: {expression!r}")
+
+    try:
+        return walk(ast.parse(str(expression), mode="eval"))
+    except SyntaxError:
+        raise TemplateError(f"Invalid template expression: {expression!r}")
+
+
+def _has_canvas_internals(c):
+    doc = getattr(c, "_doc", None)
+    return (
+        all(hasattr(doc, name) for name in ("getXObjectName", "idToObject", "addForm", "Reference"))
+        and isinstance(getattr(c, "_code", None), list)
+        and isinstance(getattr(c, "_formsinuse", None), list)
+    )
+
+
+def draw_xobject(c, xobject, x, y, width, height):
+    """Draw a prebuilt image XObject (see assets) without re-encoding it.
+
+    Mirrors canvas.drawImage. Registration tags objects with their document
+    name, so each document gets shallow copies that share the already
+    encoded stream. This goes through canvas internals of the ReportLab
+    version pinned in requirements.txt (``tests/test_render.py`` checks the
+    output); if they are missing, the source image is drawn with
+    ``drawImage`` instead, which encodes it again for every document.
+    """
+    if not _has_canvas_internals(c):
+        c.drawImage(xobject.image, x, y, width, height, mask='auto')
+        return
+
+    doc = c._doc
+    reg_name = doc.getXObjectName(xobject.name)
+    if reg_name not in doc.idToObject:
+        doc.addForm(xobject.name, copy.copy(xobject))
+        if xobject.softmask:
+            doc.Reference(copy.copy(xobject.softmask), doc.getXObjectName(xobject.softmask.name))
+
+    c._currentPageHasImages = 1
+    c.saveState()
+    c.translate(x, y)
+    c.scale(width, height)
+    c._code.append("/%s Do" % reg_name)
+    c.restoreState()
+    c._formsinuse.append(xobject.name)
+
+
+class CompiledTemplate:
+    """A template turned into flat lists of draw operations.
+
+    Operations are tuples whose first item is the kind; every coordinate,
+    colour and font in them is final. Text without fields is positioned at
+    compile time; text with fields keeps its anchor and alignment and is
+    measured per render.
+    """
+
+    def __init__(self, template_id, spec):
+        from reportlab.lib import pagesizes
+
+        self.id = template_id
+        self.version = spec.get("version", "1")
+        self.metadata = spec.get("metadata", {})
+
+        page = spec.get("page", {})
+        size = PAGE_SIZES.get(page.get("size", "letter").lower())
+        orientation = page.get("orientation", "landscape")
+        if size is None or orientation not in ORIENTATIONS:
+            raise TemplateError(f"Template {template_id}: unknown page size or orientation")
+        self.page_size = getattr(pagesizes, orientation)(getattr(pagesizes, size))
+        self.page_width, self.page_height = self.page_size
+
+        self._colors = spec.get("colors", {})
+        self._fonts = spec.get("fonts", {})
+        self._blocks = spec.get("blocks", {})
+        self._names = {"page_width": self.page_width, "page_height": self.page_height}
+        for name, expression in spec.get("vars", {}).items():
+            self._names[name] = evaluate(expression, self._names)
+
+        self.background_form = f"template-{template_id}-background"
+        self.overlay_form = f"template-{template_id}-overlay"
+        self.background = self._compile(spec.get("background", []), self._names, {}, static=True)
+        self.content = self._compile(spec.get("content", []), self._names, {}, static=False)
+        overlay = spec.get("overlay", {})
+        self.overlay_alpha = overlay.get("alpha", 1)
+        self.overlay = self._compile(overlay.get("elements", []), self._names, {}, static=True)
+
+    def _color(self, value):
+        value = self._colors.get(value, value) if isinstance(value, str) else value
+        if isinstance(value, str) and re.match(r"^#[0-9A-Fa-f]{6}$", value):
+            return tuple(int(value[i:i + 2], 16) / 255 for i in (1, 3, 5))
+        if isinstance(value, list) and len(value) == 3:
+            return tuple(value)
+        raise TemplateError(f"Template {self.id}: invalid colour {value!r}")
+
+    def _font(self, value):
+        from reportlab.pdfbase import pdfmetrics
+
+        name = self._fonts.get(value, value)
+        if name.startswith("@"):
+            name = get_asset(name[1:])
+            if name is None:
+                raise TemplateError(f"Template {self.id}: font asset {value!r} is not available")
+        try:
+            return pdfmetrics.getFont(name)
+        except KeyError:
+            raise TemplateError(f"Template {self.id}: unknown font {name!r}")
+
+    def _text(self, text, aliases):
+        """Return ``(format_string, has_fields)`` with field aliases applied."""
+        parts = []
+        has_fields = False
+        for literal, field, spec, conversion in _formatter.parse(text):
+            parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is not None:
+                has_fields = True
+                field = aliases.get(field, field)
+                parts.append("{" + field + ("!" + conversion if conversion else "") + (":" + spec if spec else "") + "}")
+        return "".join(parts), has_fields
+
+    def _compile(self, elements, names, aliases, static):
+        ops = []
+        for element in elements:
+            kind = element.get("type")
+            value = lambda key, default=None: evaluate(element.get(key, default), names)
+
+            if kind in ("group", "use"):
+                group_names = dict(names)
+                for name, expression in element.get("vars", {}).items():
+                    group_names[name] = evaluate(expression, group_names)
+                group_aliases = dict(aliases)
+                group_aliases.update({alias: aliases.get(field, field) for alias, field in element.get("fields", {}).items()})
+                children = element.get("elements") if kind == "group" else self._blocks.get(element.get("block"))
+                if children is None:
+                    raise TemplateError(f"Template {self.id}: unknown block {element.get('block')!r}")
+                group_ops = self._compile(children, group_names, group_aliases, static)
+                when, unless = element.get("when"), element.get("unless")
+                if when or unless:
+                    if static:
+                        raise TemplateError(f"Template {self.id}: conditions are only allowed in content")
+                    ops.append(("if", aliases.get(when or unless, when or unless), bool(unless), group_ops))
+                else:
+                    ops.extend(group_ops)
+
+            elif kind == "rect":
+                stroke = element.get("stroke")
+                fill = element.get("fill")
+                ops.append((
+                    "rect", value("x"), value("y"), value("width"), value("height"),
+                    self._color(stroke) if stroke else None, self._color(fill) if fill else None,
+                    element.get("line_width", 1)
+                ))
+
+            elif kind == "line":
+                ops.append((
+                    "line", value("x1"), value("y1"), value("x2"), value("y2"),
+                    self._color(element.get("color", "#000000")), element.get("line_width", 1)
+                ))
+
+            elif kind == "text":
+                font = self._font(element.get("font", "Helvetica"))
+                size = element.get("size", 12)
+                color = self._color(element.get("color", "#000000"))
+                align = element.get("align", "left")
+                if align not in ("left", "center", "right"):
+                    raise TemplateError(f"Template {self.id}: invalid alignment {align!r}")
+                text, has_fields = self._text(element.get("text", ""), aliases)
+                x, y = value("x"), value("y")
+                if has_fields and static:
+                    raise TemplateError(f"Template {self.id}: record fields are only allowed in content")
+                if has_fields:
+                    ops.append(("field_text", font, size, color, x, y, text, align))
+                else:
+                    text = text.format()
+                    width = font.stringWidth(text, size)
+                    x = {"left": x, "center": x - width / 2, "right": x - width}[align]
+                    ops.append(("text", font, size, color, x, y, text))
+
+            elif kind == "image":
+                if not static:
+                    raise TemplateError(f"Template {self.id}: images are only allowed in background and overlay")
+                ops.append(("image", element["asset"], value("x"), value("y"), value("width"), value("height")))
+
+            else:
+                raise TemplateError(f"Template {self.id}: unknown element type {kind!r}")
+        return ops
+
+    def _run(self, c, ops, values, state):
+        # ``state`` remembers the font, colours and line width already set,
+        # so consecutive elements sharing a style emit no extra operators.
+        for op in ops:
+            kind = op[0]
+            if kind == "if":
+                _, field, negate, group_ops = op
+                if bool(values.get(field)) != negate:
+                    self._run(c, group_ops, values, state)
+            elif kind in ("text", "field_text"):
+                font, size, color = op[1:4]
+                if state.get("font") != (font.fontName, size):
+                    c.setFont(font.fontName, size)
+                    state["font"] = (font.fontName, size)
+                if state.get("fill") != color:
+                    c.setFillColorRGB(*color)
+                    state["fill"] = color
+                if kind == "text":
+                    _, _, _, _, x, y, text = op
+                else:
+                    _, _, _, _, x, y, text, align = op
+                    text = text.format_map(values)
+                    if align != "left":
+                        width = font.stringWidth(text, size)
+                        x = x - width / 2 if align == "center" else x - width
+                c.drawString(x, y, text)
+            elif kind == "rect":
+                _, x, y, width, height, stroke, fill, line_width = op
+                if stroke:
+                    self._set_stroke(c, state, stroke, line_width)
+                if fill and state.get("fill") != fill:
+                    c.setFillColorRGB(*fill)
+                    state["fill"] = fill
+                c.rect(x, y, width, height, stroke=1 if stroke else 0, fill=1 if fill else 0)
+            elif kind == "line":
+                _, x1, y1, x2, y2, color, line_width = op
+                self._set_stroke(c, state, color, line_width)
+                c.line(x1, y1, x2, y2)
+            elif kind == "image":
+                _, asset, x, y, width, height = op
+                xobject = get_asset(asset)
+                if xobject is not None:
+                    draw_xobject(c, xobject, x, y, width, height)
+
+    def _set_stroke(self, c, state, color, line_width):
+        if state.get("stroke") != color:
+            c.setStrokeColorRGB(*color)
+            state["stroke"] = color
+        if state.get("line_width") != line_width:
+            c.setLineWidth(line_width)
+            state["line_width"] = line_width
+
+    def _define_forms(self, c):
+        if c.hasForm(self.background_form):
+            return
+        c.beginForm(self.background_form)
+        self._run(c, self.background, {}, {})
+        c.endForm()
+        if self.overlay:
+            # The alpha is applied by the page when the form is drawn:
+            # ReportLab does not emit ExtGState resources for form XObjects.
+            c.beginForm(self.overlay_form)
+            self._run(c, self.overlay, {}, {})
+            c.endForm()
+
+    def begin_document(self, output):
+        # invariant output keeps the bytes identical across renders of the
+        # same record, which the content-addressed PDF cache and strong
+        # ETags rely on.
+        from reportlab.pdfgen import canvas
+
+        c = canvas.Canvas(output, pagesize=self.page_size, invariant=1)
+        if "author" in self.metadata:
+            c.setAuthor(self.metadata["author"])
+        if "title" in self.metadata:
+            c.setTitle(self.metadata["title"])
+        if "subject" in self.metadata:
+            c.setSubject(self.metadata["subject"])
+        return c
+
+    def draw_page(self, c, values):
+        """Draw one certificate on the current page of ``c``."""
+        values = _Values(values)
+        self._define_forms(c)
+        c.doForm(self.background_form)
+        self._run(c, self.content, values, {})
+        if self.overlay:
+            c.saveState()
+            c.setFillAlpha(self.overlay_alpha)
+            c.setStrokeAlpha(self.overlay_alpha)
+            c.doForm(self.overlay_form)
+            c.restoreState()
+
+
+register_asset("default_template", get_template)
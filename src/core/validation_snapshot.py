@@ -0,0 +1,229 @@
+"""Compact, read-only snapshot of the certificate store for validation.
+
+    python -m src.core.validation_snapshot data/validation.snapshot
+    python -m src.core.validation_snapshot out.snapshot --db data/certificates_db.json --backend sqlite
+
+Layout (little endian):
+
+    header    magic, record count, id width, field count, table offset, heap offset
+    fields    field names, NUL separated
+    table     one row per certificate, sorted by id:
+              id padded with NULs to the id width, then (offset, length)
+              into the heap for every field
+    heap      UTF-8 strings, each distinct value stored once
+
+Readers ``mmap`` the file and binary-search the table, so opening it costs
+the same at any size and every process serving it shares the page cache.
+"""
+import os
+import sys
+import mmap
+import struct
+import argparse
+import threading
+
+from src.core.storage import StorageError, atomic_write, open_storage, BACKENDS
+
+MAGIC = b"CERTVAL1"
+HEADER = struct.Struct("<8sIHHIQ")
+
+# Everything validation_response and the PDF renderer read from a record.
+SNAPSHOT_FIELDS = (
+    "verification_code",
+    "student_name",
+    "course_name",
+    "issue_date",
+    "instructor",
+    "instructor_title",
+    "co_instructor",
+    "co_instructor_title",
+    "organization",
+    "place",
+    "certification_type",
+    "hours",
+    "template",
+)
+
+
+def export_snapshot(records, path, fields=SNAPSHOT_FIELDS):
+    """Write ``records`` to ``path`` as a validation snapshot and return the count."""
+    slots = struct.Struct("<" + "II" * len(fields))
+    rows = []
+    heap = bytearray()
+    heap_index = {}
+    for record in records:
+        positions = []
+        for field in fields:
+            value = str(record.get(field) or "").encode("utf-8")
+            offset = heap_index.get(value)
+            if offset is None:
+                offset = heap_index[value] = len(heap)
+                heap += value
+            positions += (offset, len(value))
+        rows.append((record["id"].encode("utf-8"), slots.pack(*positions)))
+    rows.sort(key=lambda row: row[0])
+
+    id_width = max((len(cert_id) for cert_id, _ in rows), default=0)
+    field_names = b"\0".join(field.encode("utf-8") for field in fields)
+    table_offset = HEADER.size + len(field_names)
+    heap_offset = table_offset + len(rows) * (id_width + slots.size)
+
+    def write(f):
+        f.write(HEADER.pack(MAGIC, len(rows), id_width, len(fields), table_offset, heap_offset))
+        f.write(field_names)
+        f.write(b"".join(cert_id.ljust(id_width, b"\0") + packed for cert_id, packed in rows))
+        f.write(heap)
+
+    atomic_write(path, write, binary=True)
+    return len(rows)
+
+
+class SnapshotFile:
+    """One mapped snapshot file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, id_width, field_count, table_offset, heap_offset = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.map.close()
+            raise StorageError(f"{path} is not a validation snapshot")
+
+        self.fields = tuple(name.decode("utf-8") for name in self.map[HEADER.size:table_offset].split(b"\0"))
+        self.count = count
+        self.id_width = id_width
+        self.slots = struct.Struct("<" + "II" * field_count)
+        self.row_size = id_width + self.slots.size
+        self.table_offset = table_offset
+        self.heap_offset = heap_offset
+
+    def find(self, key):
+        """Binary-search the id table; return the row offset or None."""
+        if len(key) > self.id_width:
+            return None
+        key = key.ljust(self.id_width, b"\0")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            start = self.table_offset + middle * self.row_size
+            probe = self.map[start:start + self.id_width]
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                return start
+        return None
+
+    def decode(self, cert_id, start):
+        slots = self.slots.unpack_from(self.map, start + self.id_width)
+        record = {"id": cert_id}
+        for number, field in enumerate(self.fields):
+            offset = self.heap_offset + slots[2 * number]
+            record[field] = self.map[offset:offset + slots[2 * number + 1]].decode("utf-8")
+        return record
+
+    def ids(self):
+        for number in range(self.count):
+            start = self.table_offset + number * self.row_size
+            yield start, self.map[start:start + self.id_width].rstrip(b"\0").decode("utf-8")
+
+    def __iter__(self):
+        for start, cert_id in self.ids():
+            yield self.decode(cert_id, start)
+
+
+class ValidationSnapshot:
+    """Read-only storage backend over a file written by ``export_snapshot``.
+
+    The file is mapped, not loaded: nothing is parsed until a lookup, and a
+    lookup only decodes the one row it finds. A new export replacing the
+    file is picked up on the next lookup.
+    """
+
+    name = "snapshot"
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._file = None
+        self._refresh()
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            raise StorageError(f"Validation snapshot {self.path} not found")
+        signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if signature == self._signature:
+            return self._file
+
+        with self._lock:
+            if signature != self._signature:
+                # The replaced map is left to the garbage collector, since a
+                # concurrent lookup may still be reading from it.
+                self._file = SnapshotFile(self.path)
+                self._signature = signature
+            return self._file
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def generation(self):
+        self._refresh()
+        return self._signature
+
+    def get(self, cert_id):
+        snapshot = self._refresh()
+        start = snapshot.find(cert_id.encode("utf-8"))
+        if start is None:
+            return None
+        return snapshot.decode(cert_id, start)
+
+    def get_many(self, cert_ids):
+        snapshot = self._refresh()
+        found = {}
+        for cert_id in cert_ids:
+            start = snapshot.find(cert_id.encode("utf-8"))
+            if start is not None:
+                found[cert_id] = snapshot.decode(cert_id, start)
+        return found
+
+    def put(self, cert_data):
+        self.put_many([cert_data])
+
+    def put_many(self, records):
+        raise StorageError("The validation snapshot is read-only")
+
+    def insert_many(self, records):
+        raise StorageError("The validation snapshot is read-only")
+
+    def iter_records(self):
+        return iter(self._refresh())
+
+    def iter_ids(self):
+        return (cert_id for _, cert_id in self._refresh().ids())
+
+    def count(self):
+        return self._refresh().count
+
+    def size_bytes(self):
+        return os.path.getsize(self.path) if self.exists() else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the certificate store as a validation snapshot")
+    parser.add_argument("output", help="Snapshot file to write")
+    parser.add_argument("--db", default=os.environ.get("CERT_DB_PATH", "data/certificates_db.json"))
+    parser.add_argument("--backend", default=os.environ.get("CERT_DB_BACKEND", "json"),
+                        choices=[backend for backend in BACKENDS if backend != "snapshot"])
+    args = parser.parse_args(argv)
+
+    count = export_snapshot(open_storage(args.db, args.backend).iter_records(), args.output)
+    print(f"Exported {count} certificates to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
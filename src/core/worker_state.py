@@ -0,0 +1,80 @@
+"""State shared between the workers of a pre-forking server.
+
+The parent sets ``shared_dir`` before forking. Each worker then publishes
+its metrics and profiler samples there as ``<pid>.<kind>.json`` every
+``CERT_WORKER_PUBLISH_SECONDS``, and once more when it exits, so whichever
+worker answers a request can merge everyone's numbers with its own.
+Without a shared directory (a single server process) nothing is written.
+"""
+import os
+import json
+import time
+import threading
+
+CERT_WORKER_PUBLISH_SECONDS = float(os.environ.get("CERT_WORKER_PUBLISH_SECONDS", "1"))
+
+shared_dir = None
+
+_publishers = []
+
+
+def add_publisher(publish):
+    """Register a function that writes this process's state to ``shared_dir``."""
+    _publishers.append(publish)
+
+
+def path_for(name, kind):
+    return os.path.join(shared_dir, f"{name}.{kind}.json")
+
+
+def write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def read_published(kind):
+    """``(name, data)`` for every file of ``kind`` except this process's own."""
+    suffix = f".{kind}.json"
+    own = f"{os.getpid()}{suffix}"
+    published = []
+    for file_name in sorted(os.listdir(shared_dir)):
+        if file_name.endswith(suffix) and file_name != own:
+            data = read_json(os.path.join(shared_dir, file_name))
+            if data is not None:
+                published.append((file_name[:-len(suffix)], data))
+    return published
+
+
+def remove_published(kind):
+    """Delete the files of ``kind`` other processes published."""
+    for name, _ in read_published(kind):
+        try:
+            os.unlink(path_for(name, kind))
+        except FileNotFoundError:
+            pass
+
+
+def publish():
+    if shared_dir is None:
+        return
+    for publish_state in _publishers:
+        publish_state()
+
+
+def start_publishing(interval=CERT_WORKER_PUBLISH_SECONDS):
+    def loop():
+        while True:
+            time.sleep(interval)
+            publish()
+
+    threading.Thread(target=loop, name="cert-worker-state", daemon=True).start()
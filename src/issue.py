@@ -0,0 +1,313 @@
+"""Issue certificates for a whole roster without going through the HTTP API.
+
+    python -m src.issue roster.csv --output cohort.zip
+    python -m src.issue roster.jsonl --output pdfs/
+    python -m src.issue inputs/ --output cohort.zip
+
+The roster is a CSV file with a header row, a JSONL file, or a directory of
+``key: value`` input files as read by ``read_input_file``. Rows are issued in
+chunks: each chunk is stored with one write and rendered on all cores. Every
+written PDF is recorded in ``<output>.checkpoint``, so an interrupted run can
+be started again with the same arguments and picks up where it stopped. A
+row that cannot be read (including a JSONL line that is not a JSON object)
+is reported with its line number and skipped. Certificates are only stored
+under IDs that are still free, as by the API: a row that differs from the
+certificate already issued under its ID fails.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import zipfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from src.core.assets import preload_assets
+from src.core.certificate_renderer import (
+    read_input_file,
+    issue_certificate_record,
+    render_certificate_pdf,
+    CertificateDB,
+    RENDER_FIELDS,
+    conflict_message
+)
+from src.core.logs import configure_logging
+from src.core.templates import template_exists
+
+# Keys used by read_input_file-style files, mapped to record fields.
+INPUT_FILE_ALIASES = {
+    "student": "student_name",
+    "course": "course_name",
+    "date": "issue_date",
+    "teacher": "instructor",
+    "co-teacher": "co_instructor",
+}
+
+
+def parse_row(row):
+    """Turn a raw JSONL line into a dict; rows from CSV and input files pass through."""
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError as e:
+            raise ValueError(f"invalid JSON ({e})")
+        if not isinstance(row, dict):
+            raise ValueError(f"expected a JSON object, got {type(row).__name__}")
+    return row
+
+
+def normalize_row(row):
+    data = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        key = key.strip().lower()
+        key = INPUT_FILE_ALIASES.get(key, key)
+        if key in RENDER_FIELDS:
+            if isinstance(value, (dict, list)):
+                raise ValueError(f"{key} must be text or a number")
+            # JSONL rows may hold numbers (``"hours": 40``) or nulls.
+            data[key] = "" if value is None else str(value).strip()
+    missing = [field for field in ("student_name", "course_name") if not data.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    if data.get("template") and not template_exists(data["template"]):
+        raise ValueError(f"unknown template {data['template']}")
+    return data
+
+
+def read_roster(path):
+    """Yield ``(source, row)`` pairs from a CSV/JSONL roster or an input directory.
+
+    JSONL lines are yielded unparsed, for ``parse_row``, so a malformed
+    line fails only its own row.
+    """
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            file_path = os.path.join(path, name)
+            if os.path.isfile(file_path):
+                yield file_path, read_input_file(file_path)
+    elif path.endswith(".jsonl") or path.endswith(".ndjson"):
+        with open(path, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    yield f"{path}:{line_number}", line
+    else:
+        with open(path, 'r', newline='') as f:
+            for line_number, row in enumerate(csv.DictReader(f), 2):
+                yield f"{path}:{line_number}", row
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _render(record):
+    return record["id"], render_certificate_pdf(record)
+
+
+class OutputWriter:
+    """Writes PDFs into a ZIP archive or a directory.
+
+    A ZIP archive is built from parts: each chunk goes into its own ZIP in
+    ``<output>.parts``, moved into place by ``commit``, and ``close`` merges
+    the parts into the archive. A run killed midway leaves only whole parts
+    behind, which the next run merges along with its own.
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.parts_dir = None
+        self.part = None
+        self.part_file = None
+        if output.endswith(".zip"):
+            if os.path.exists(output) and not zipfile.is_zipfile(output):
+                raise SystemExit(f"{output} exists and is not a ZIP archive")
+            self.parts_dir = output + ".parts"
+            os.makedirs(self.parts_dir, exist_ok=True)
+        else:
+            os.makedirs(output, exist_ok=True)
+
+    def write(self, cert_id, pdf_bytes):
+        name = f"certificate_{cert_id}.pdf"
+        if self.parts_dir is not None:
+            if self.part is None:
+                self.part_file = open(os.path.join(self.parts_dir, "part.tmp"), 'wb')
+                self.part = zipfile.ZipFile(self.part_file, 'w', compression=zipfile.ZIP_STORED)
+            self.part.writestr(name, pdf_bytes)
+        else:
+            tmp_path = os.path.join(self.output, name + ".tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, os.path.join(self.output, name))
+
+    def _parts(self):
+        return [
+            os.path.join(self.parts_dir, name) for name in sorted(os.listdir(self.parts_dir))
+            if name.startswith("part-") and name.endswith(".zip")
+        ]
+
+    def _close_part(self):
+        self.part.close()
+        self.part_file.flush()
+        os.fsync(self.part_file.fileno())
+        self.part_file.close()
+        self.part = None
+        return self.part_file.name
+
+    def commit(self):
+        """Finish the PDFs written since the last commit; call before checkpointing them."""
+        if self.part is None:
+            return
+        tmp_path = self._close_part()
+        os.replace(tmp_path, os.path.join(self.parts_dir, f"part-{len(self._parts()) + 1:06d}.zip"))
+
+    def close(self):
+        if self.parts_dir is None:
+            return
+        if self.part is not None:
+            # An unfinished chunk; its rows are not checkpointed and will be rendered again.
+            os.unlink(self._close_part())
+        parts = self._parts()
+        if parts or not os.path.exists(self.output):
+            self._merge(parts)
+        # Also drops a half-written part left by a run that was killed.
+        shutil.rmtree(self.parts_dir)
+
+    def _merge(self, parts):
+        sources = ([self.output] if os.path.exists(self.output) else []) + parts
+        tmp_path = self.output + ".tmp"
+        names = set()
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for source in sources:
+                with zipfile.ZipFile(source) as part:
+                    for info in part.infolist():
+                        # A part can repeat PDFs if a run died between moving it into place and checkpointing.
+                        if info.filename not in names:
+                            names.add(info.filename)
+                            archive.writestr(info, part.read(info))
+        os.replace(tmp_path, self.output)
+        for part in parts:
+            os.unlink(part)
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+class Progress:
+    def __init__(self, stream=sys.stderr, interval=1.0):
+        self.stream = stream
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last_report = 0.0
+        self.rendered = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def report(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        elapsed = now - self.started
+        rate = self.rendered / elapsed if elapsed else 0.0
+        self.stream.write(
+            f"\rrendered {self.rendered}  skipped {self.skipped}  failed {self.failed}  "
+            f"({rate:.1f}/s, {elapsed:.0f}s)"
+        )
+        if force:
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+def issue_roster(roster, output, workers=None, chunk_size=500, checkpoint=None):
+    checkpoint = checkpoint or output.rstrip("/") + ".checkpoint"
+    done = load_checkpoint(checkpoint)
+    progress = Progress()
+    db = CertificateDB()
+    writer = OutputWriter(output)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=preload_assets) as executor, \
+                open(checkpoint, 'a') as checkpoint_file:
+            for chunk in chunked(read_roster(roster), chunk_size):
+                records = []
+                for source, row in chunk:
+                    try:
+                        record = issue_certificate_record(normalize_row(parse_row(row)))
+                    except ValueError as e:
+                        progress.failed += 1
+                        sys.stderr.write(f"\n{source}: {e}\n")
+                        continue
+                    if record["id"] in done:
+                        progress.skipped += 1
+                        continue
+                    records.append((source, record))
+
+                # Stored only if the ID is still free, as the API does: a row
+                # that differs from the certificate already issued under its ID
+                # fails, an identical one is not stored again but still rendered.
+                statuses = db.insert_certificates([record for _, record in records]) if records else []
+                to_render = []
+                for (source, record), status in zip(records, statuses):
+                    if status == "conflict":
+                        progress.failed += 1
+                        sys.stderr.write(f"\n{source}: {conflict_message(record['id'])}\n")
+                        continue
+                    if status == "issued":
+                        progress.skipped += 1
+                    to_render.append(record)
+                records = to_render
+
+                if not records:
+                    progress.report()
+                    continue
+
+                rendered = []
+                for cert_id, pdf_bytes in executor.map(_render, records, chunksize=8):
+                    writer.write(cert_id, pdf_bytes)
+                    rendered.append(cert_id)
+                    progress.rendered += 1
+                    progress.report()
+                writer.commit()
+                for cert_id in rendered:
+                    checkpoint_file.write(cert_id + "\n")
+                    done.add(cert_id)
+                checkpoint_file.flush()
+                os.fsync(checkpoint_file.fileno())
+    finally:
+        writer.close()
+        progress.report(force=True)
+
+    return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Issue and render certificates for a roster")
+    parser.add_argument("roster", help="CSV file, JSONL file, or directory of input files")
+    parser.add_argument("--output", "-o", required=True, help="ZIP file (*.zip) or directory for the PDFs")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Rows stored and rendered per chunk")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    progress = issue_roster(args.roster, args.output, args.workers, args.chunk_size, args.checkpoint)
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,21 @@
 import os
-from src.api.api import start_api_server
+import logging
+from src.api.prefork import CERT_SERVER_WORKERS, CERT_SERVER_MAX_REQUESTS, serve
+from src.core.logs import configure_logging
+
+logger = logging.getLogger("certificates")
 
 
 def main():
     os.makedirs('data', exist_ok=True)
-    print("Starting API server...")
-    start_api_server()
+    configure_logging()
+    if CERT_SERVER_WORKERS > 1 or CERT_SERVER_MAX_REQUESTS:
+        logger.info("Starting API server", extra={"workers": CERT_SERVER_WORKERS})
+        serve()
+    else:
+        from src.api.api import start_api_server
+        logger.info("Starting API server")
+        start_api_server()
 
 
 if __name__ == "__main__":
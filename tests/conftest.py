@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The app reads its configuration at import time.
+DATA_DIR = tempfile.mkdtemp(prefix="cert-tests-")
+os.environ.setdefault("ADMIN_TOKEN", "test-admin-token")
+os.environ.setdefault("CERT_DB_PATH", os.path.join(DATA_DIR, "certificates_db.json"))
+os.environ.setdefault("CERT_JOBS_DB_PATH", os.path.join(DATA_DIR, "jobs.sqlite3"))
+os.environ.setdefault("CERT_RENDER_WORKERS", "0")
+os.environ.setdefault("CERT_VALIDATE_RATE", "1")
+os.environ.setdefault("CERT_VALIDATE_BURST", "50")
+os.environ.setdefault("CERT_VALIDATE_BATCH_RATE", "1")
+
+
+@pytest.fixture
+def client():
+    from starlette.testclient import TestClient
+    from src.api import certificate_service
+    from src.core.certificate_renderer import CertificateDB, issue_certificate_record
+
+    if not CertificateDB().exists():
+        CertificateDB().save_certificate(issue_certificate_record({
+            "student_name": "Ana Silva",
+            "course_name": "Kubernetes Fundamentals",
+            "issue_date": "2025-03-01",
+        }))
+    certificate_service.validate_limiter._buckets.clear()
+    certificate_service.validate_batch_limiter._buckets.clear()
+    return TestClient(certificate_service.app)
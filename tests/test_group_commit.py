@@ -0,0 +1,75 @@
+import os
+import threading
+
+import pytest
+
+from src.core.storage import GroupCommitter, atomic_write
+
+
+def run_concurrently(count, target):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(index):
+        barrier.wait()
+        try:
+            results[index] = target(index)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_submits_share_flushes_and_get_their_own_results():
+    flushed = []
+
+    def flush(records):
+        flushed.append(list(records))
+        return [record * 10 for record in records]
+
+    committer = GroupCommitter(flush, window=0.05)
+    results = run_concurrently(8, lambda index: committer.submit([index, index + 100]))
+
+    assert results == [[index * 10, (index + 100) * 10] for index in range(8)]
+    assert sorted(record for batch in flushed for record in batch) == sorted(list(range(8)) + list(range(100, 108)))
+    assert committer.commits == len(flushed) < 8
+    assert committer.records == 16
+
+
+def test_flush_errors_reach_every_caller_in_the_batch():
+    calls = []
+
+    def flush(records):
+        calls.append(records)
+        if len(calls) == 1:
+            raise OSError("disk full")
+
+    committer = GroupCommitter(flush, window=0.05)
+    results = run_concurrently(4, lambda index: committer.submit([index]))
+
+    failed = [result for result in results if isinstance(result, OSError)]
+    assert failed and len(failed) == len(calls[0])
+    # The failed batch released the leader role: later writes still go through.
+    assert committer.submit(["after"]) is None
+    assert calls[-1] == ["after"]
+
+
+def test_atomic_write_leaves_the_old_file_when_writing_fails(tmp_path):
+    path = str(tmp_path / "data.json")
+    atomic_write(path, lambda f: f.write("old"))
+
+    def fail(f):
+        f.write("partial")
+        raise RuntimeError("interrupted")
+
+    with pytest.raises(RuntimeError):
+        atomic_write(path, fail)
+
+    with open(path) as f:
+        assert f.read() == "old"
+    assert os.listdir(tmp_path) == ["data.json"]
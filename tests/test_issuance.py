@@ -0,0 +1,98 @@
+import threading
+import multiprocessing
+
+import pytest
+
+from src.core.certificate_renderer import CertificateDB, issue_certificate_record
+from src.core.storage import JSONStorage, LogStorage, SQLiteStorage
+
+STORAGES = {
+    "json": lambda directory: JSONStorage(str(directory / "certs.json")),
+    "sqlite": lambda directory: SQLiteStorage(str(directory / "certs.sqlite3")),
+    "log": lambda directory: LogStorage(str(directory / "certs")),
+}
+
+ADMIN = {"X-Admin-Token": "test-admin-token"}
+
+
+def payload(student, **fields):
+    return {
+        "student_name": student,
+        "course_name": "Race Course",
+        "issue_date": "2025-05-01",
+        "instructor": "Ada",
+        "instructor_title": "Instructor",
+        "co_instructor": "",
+        "co_instructor_title": "",
+        "organization": "CNCF",
+        "place": "Online",
+        "certification_type": "Completion",
+        "hours": "8",
+        **fields,
+    }
+
+
+def insert_from_process(backend, directory, record, barrier, results):
+    storage = STORAGES[backend](directory)
+    barrier.wait()
+    results.put((record["instructor"], storage.insert_many([record])[0]))
+
+
+@pytest.mark.parametrize("backend", sorted(STORAGES))
+def test_racing_inserts_of_one_id_store_exactly_one(backend, tmp_path):
+    STORAGES[backend](tmp_path)
+    records = [issue_certificate_record(payload("Racer", instructor=name)) for name in ("Ada", "Bea")]
+    context = multiprocessing.get_context("fork")
+    barrier, results = context.Barrier(2), context.Queue()
+    processes = [
+        context.Process(target=insert_from_process, args=(backend, tmp_path, record, barrier, results))
+        for record in records
+    ]
+    for process in processes:
+        process.start()
+    outcomes = dict(results.get(timeout=30) for _ in processes)
+    for process in processes:
+        process.join()
+
+    winners = [name for name, stored in outcomes.items() if stored is None]
+    assert len(winners) == 1
+    [loser] = set(outcomes) - set(winners)
+    assert outcomes[loser]["instructor"] == winners[0]
+    assert STORAGES[backend](tmp_path).get_many([records[0]["id"]])[records[0]["id"]]["instructor"] == winners[0]
+
+
+def test_same_details_twice_are_new_then_issued():
+    record = issue_certificate_record(payload("Repeat"))
+    db = CertificateDB()
+    assert db.insert_certificates([record, dict(record)]) == ["new", "issued"]
+    assert db.insert_certificates([issue_certificate_record(payload("Repeat", hours="9"))]) == ["conflict"]
+
+
+def test_racing_api_requests_give_one_issue_and_one_already_issued(client):
+    barrier = threading.Barrier(2)
+    responses = []
+
+    def generate():
+        barrier.wait()
+        responses.append(client.post("/api/generate", json=payload("Api Racer"), headers=ADMIN))
+
+    threads = [threading.Thread(target=generate) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert sorted(response.json()["already_issued"] for response in responses) == [False, True]
+
+
+def test_different_details_under_an_issued_id_get_409_and_change_nothing(client):
+    first = client.post("/api/generate", json=payload("Api Conflict", instructor="Ada"), headers=ADMIN)
+    assert first.status_code == 200
+    cert_id = first.json()["certificate_id"]
+    before = CertificateDB().get_certificate(cert_id).to_dict()
+
+    response = client.post("/api/generate", json=payload("Api Conflict", instructor="Bea"), headers=ADMIN)
+
+    assert response.status_code == 409
+    assert CertificateDB().get_certificate(cert_id).to_dict() == before
@@ -0,0 +1,58 @@
+import os
+import json
+import zipfile
+
+from src.core.certificate_renderer import CertificateDB, issue_certificate_record
+from src.issue import issue_roster, main
+
+
+def write_roster(path, rows):
+    with open(path, 'w') as f:
+        for row in rows:
+            f.write(row if isinstance(row, str) else json.dumps(row) + "\n")
+    return str(path)
+
+
+def row(student, **fields):
+    return {"student_name": student, "course_name": "Roster Course", "issue_date": "2025-04-01", **fields}
+
+
+def zip_names(path):
+    with zipfile.ZipFile(path) as archive:
+        return sorted(archive.namelist())
+
+
+def test_reissue_with_different_details_fails_and_keeps_the_stored_certificate(tmp_path):
+    first = write_roster(tmp_path / "first.jsonl", [row("Conflict One", instructor="Carla"), row("Conflict Two")])
+    progress = issue_roster(first, str(tmp_path / "first.zip"), workers=1)
+    assert (progress.rendered, progress.failed) == (2, 0)
+
+    # Same rows in a new run: one changed, one identical.
+    changed = row("Conflict One", instructor="Bruno")
+    second = write_roster(tmp_path / "second.jsonl", [changed, row("Conflict Two")])
+    progress = issue_roster(second, str(tmp_path / "second.zip"), workers=1)
+
+    assert (progress.failed, progress.skipped, progress.rendered) == (1, 1, 1)
+    assert len(zip_names(tmp_path / "second.zip")) == 1
+    stored = CertificateDB().get_certificate(issue_certificate_record(changed)["id"])
+    assert stored.instructor == "Carla"
+
+
+def test_rows_with_numbers_are_issued_and_unreadable_rows_are_skipped(tmp_path, capsys):
+    roster = write_roster(tmp_path / "roster.jsonl", [
+        row("Numeric Hours", hours=40),
+        "{not json\n",
+        "[1, 2]\n",
+        row("Nested Field", place={"city": "Recife"}),
+        row("Null Instructor", instructor=None),
+    ])
+    status = main([roster, "--output", str(tmp_path / "out"), "--workers", "1"])
+
+    assert status == 1
+    assert len([name for name in os.listdir(tmp_path / "out") if name.endswith(".pdf")]) == 2
+    stored = CertificateDB().get_certificate(issue_certificate_record(row("Numeric Hours", hours="40"))["id"])
+    assert stored.hours == "40"
+    errors = capsys.readouterr().err
+    assert "roster.jsonl:2: invalid JSON" in errors
+    assert "roster.jsonl:3: expected a JSON object" in errors
+    assert "roster.jsonl:4: place must be text or a number" in errors
@@ -0,0 +1,77 @@
+import time
+import asyncio
+
+from starlette.testclient import TestClient
+
+from src.api.certificate_service import create_combined_app
+from src.core.jobs import JobQueue, JobRunner
+
+ADMIN = {"X-Admin-Token": "test-admin-token"}
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.2, max_attempts=3)
+    job_id = queue.enqueue("generate", {"n": 1})
+
+    assert queue.claim("worker-a")["id"] == job_id
+    # Still leased to worker-a.
+    assert queue.claim("worker-b") is None
+
+    time.sleep(0.3)
+    job = queue.claim("worker-b")
+    assert job == {"id": job_id, "kind": "generate", "payload": {"n": 1}}
+    assert queue.get(job_id)["attempts"] == 2
+
+
+def test_job_lost_too_often_fails(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.05, max_attempts=2)
+    job_id = queue.enqueue("generate", {})
+    for worker in ("a", "b"):
+        assert queue.claim(worker)["id"] == job_id
+        time.sleep(0.1)
+
+    assert queue.claim("c") is None
+    assert queue.get(job_id)["status"] == "failed"
+
+
+def test_completed_job_is_not_run_again(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.2)
+    job_id = queue.enqueue("generate", {"n": 2})
+    calls = []
+
+    async def handler(payload):
+        calls.append(payload)
+        return {"double": payload["n"] * 2}
+
+    async def run():
+        runner = JobRunner(queue, {"generate": handler}, workers=2, poll_interval=0.01)
+        await runner.start()
+        # Well past the lease, so a completed job would have been reclaimed by now.
+        await asyncio.sleep(0.5)
+        await runner.stop()
+
+    asyncio.run(run())
+
+    assert calls == [{"n": 2}]
+    job = queue.get(job_id)
+    assert (job["status"], job["result"], job["attempts"]) == ("succeeded", {"double": 4}, 1)
+    assert queue.claim("late-worker") is None
+
+
+def test_each_app_gets_its_own_job_queue(tmp_path):
+    app = create_combined_app("full", jobs_db_file=str(tmp_path / "jobs.sqlite3"))
+    client = TestClient(app)
+    payload = {
+        "student_name": "Queued Student", "course_name": "Queued Course", "issue_date": "2025-07-01",
+        "instructor": "", "instructor_title": "", "co_instructor": "", "co_instructor_title": "",
+        "organization": "", "place": "", "certification_type": "", "hours": "",
+    }
+
+    response = client.post("/api/generate?mode=async", json=payload, headers=ADMIN)
+
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    # Not started, so nothing runs the job; it is only in this app's queue.
+    assert client.get(f"/api/jobs/{job_id}", headers=ADMIN).json()["status"] == "queued"
+    assert app.state.job_queue.counts() == {"queued": 1}
+    assert client.get("/api/stats", headers=ADMIN).json()["jobs"] == {"queued": 1}
@@ -0,0 +1,83 @@
+import os
+import multiprocessing
+
+from src.core.storage import LogStorage
+
+
+def record(cert_id, **fields):
+    return {"id": cert_id, "verification_code": "CODE", "student_name": f"Student {cert_id}", **fields}
+
+
+def append_from_process(base_path, worker, count):
+    store = LogStorage(base_path, compact_bytes=4096, group_commit_window=0)
+    for number in range(0, count, 5):
+        store.put_many([record(f"W{worker}-{n}") for n in range(number, number + 5)])
+    if store._compactor is not None:
+        store._compactor.join()
+
+
+def log_files(base_path, kind):
+    prefix = os.path.basename(base_path) + f".{kind}."
+    return sorted(
+        name for name in os.listdir(os.path.dirname(base_path))
+        if name.startswith(prefix) and not name.endswith((".idx", ".tmp"))
+    )
+
+
+def test_appends_from_several_processes_are_all_kept(tmp_path):
+    base_path = str(tmp_path / "certs")
+    LogStorage(base_path)
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=append_from_process, args=(base_path, worker, 100)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    store = LogStorage(base_path, compact_bytes=0)
+    assert store.count() == 400
+    for worker in range(4):
+        for number in range(100):
+            assert store.get(f"W{worker}-{number}") == record(f"W{worker}-{number}")
+    # The small compaction threshold made the writers compact while others appended.
+    assert log_files(base_path, "snapshot")
+
+
+def test_reopen_after_compaction_replays_only_the_tail(tmp_path):
+    base_path = str(tmp_path / "certs")
+    store = LogStorage(base_path, compact_bytes=0, group_commit_window=0)
+    store.put_many([record(f"OLD-{number}") for number in range(50)])
+    store.put(record("OLD-7", course_name="replaced"))
+    assert store.compact()
+    store.put_many([record(f"NEW-{number}") for number in range(5)])
+
+    [snapshot] = log_files(base_path, "snapshot")
+    [tail] = log_files(base_path, "log")
+    assert int(tail.rsplit(".", 1)[1]) > int(snapshot.rsplit(".", 1)[1])
+
+    reopened = LogStorage(base_path, compact_bytes=0)
+    assert reopened._snapshot == int(snapshot.rsplit(".", 1)[1])
+    assert reopened._log_bytes() == os.path.getsize(os.path.join(tmp_path, tail))
+    assert reopened.count() == 55
+    assert reopened.get("OLD-7")["course_name"] == "replaced"
+    assert reopened.get("NEW-4") == record("NEW-4")
+
+
+def test_torn_lines_are_skipped_and_later_appends_survive(tmp_path):
+    base_path = str(tmp_path / "certs")
+    store = LogStorage(base_path, compact_bytes=0, group_commit_window=0)
+    store.put_many([record("A"), record("B")])
+    [segment] = log_files(base_path, "log")
+    with open(os.path.join(tmp_path, segment), 'ab') as f:
+        # A writer that crashed mid-append, then one that left a garbled line.
+        f.write(b'{"id": "GARBLED", "verif\n{"id": "TORN", "verification_co')
+
+    reopened = LogStorage(base_path, compact_bytes=0, group_commit_window=0)
+    assert reopened.count() == 2
+    assert reopened.get("TORN") is None
+
+    reopened.put(record("C"))
+    again = LogStorage(base_path, compact_bytes=0)
+    assert sorted(r["id"] for r in again.iter_records()) == ["A", "B", "C"]
+    assert again.get("C") == record("C")
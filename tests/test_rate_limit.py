@@ -0,0 +1,53 @@
+import pytest
+from starlette.requests import Request
+
+from src.api.rate_limit import TokenBucketLimiter, client_address, parse_networks
+
+
+def pairs(count):
+    return [{"certificate_id": f"KC-209901-{number:06X}-0000", "verification_code": "x"} for number in range(count)]
+
+
+def request_from(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (peer, 40000), "headers": headers})
+
+
+def test_take_charges_the_full_cost():
+    limiter = TokenBucketLimiter(rate=0.001, burst=50)
+    assert limiter.take("client", 30) == 0
+    assert limiter.take("client", 30) > 0
+    assert limiter.take("client", 20) == 0
+
+
+def test_take_rejects_costs_above_the_burst():
+    limiter = TokenBucketLimiter(rate=10, burst=50)
+    with pytest.raises(ValueError):
+        limiter.take("client", 51)
+
+
+def test_batch_of_the_maximum_size_is_accepted(client):
+    assert client.post("/api/validate/batch", json=pairs(500)).status_code == 200
+    assert client.post("/api/validate/batch", json=pairs(501)).status_code == 413
+
+
+def test_batch_costs_one_token_per_pair(client):
+    assert client.post("/api/validate/batch", json=pairs(400)).status_code == 200
+    response = client.post("/api/validate/batch", json=pairs(200))
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) > 0
+
+
+def test_batches_do_not_spend_the_single_validation_budget(client):
+    assert client.post("/api/validate/batch", json=pairs(500)).status_code == 200
+    assert client.post("/api/validate", json=pairs(1)[0]).status_code == 200
+
+
+def test_client_address_reads_forwarded_for_only_from_trusted_proxies():
+    proxies = parse_networks("10.0.0.0/8, 192.168.1.1")
+    assert client_address(request_from("203.0.113.9", "198.51.100.1"), proxies) == "203.0.113.9"
+    assert client_address(request_from("10.1.2.3", "198.51.100.1"), proxies) == "198.51.100.1"
+    # A client-supplied entry on the left is not trusted over the proxies' own.
+    assert client_address(request_from("10.1.2.3", "1.1.1.1, 198.51.100.1, 192.168.1.1"), proxies) == "198.51.100.1"
+    assert client_address(request_from("10.1.2.3"), proxies) == "10.1.2.3"
+    assert client_address(request_from("10.1.2.3", "198.51.100.1")) == "10.1.2.3"
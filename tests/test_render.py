@@ -0,0 +1,88 @@
+import os
+import re
+import zlib
+import base64
+
+import pytest
+import reportlab
+
+from src.core import templates
+from src.core.assets import preload_assets
+from src.core.certificate_renderer import issue_certificate_record, render_certificate_pdf
+
+RECORD = issue_certificate_record({
+    "student_name": "Ana Silva",
+    "course_name": "Kubernetes Fundamentals",
+    "issue_date": "2025-03-01",
+    "instructor": "Carla Souza",
+    "instructor_title": "Lead Instructor",
+})
+
+REQUIREMENTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "requirements.txt")
+WATERMARK = "FormXob.k8s-watermark"
+
+OBJECT = re.compile(rb"(\d+) 0 obj(.*?)endobj", re.S)
+STREAM = re.compile(rb"(.*?)stream\r?\n(.*?)endstream", re.S)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def assets():
+    preload_assets()
+
+
+def pdf_objects(pdf_bytes):
+    """``{number: (dictionary, decoded stream or None)}`` for a PDF as ReportLab writes it."""
+    objects = {}
+    for number, body in OBJECT.findall(pdf_bytes):
+        dictionary, stream = body, None
+        match = STREAM.match(body)
+        if match:
+            dictionary, stream = match.groups()
+            if b"/ASCII85Decode" in dictionary:
+                stream = base64.a85decode(stream.strip(), adobe=True)
+            if b"/FlateDecode" in dictionary:
+                stream = zlib.decompressobj().decompress(stream)
+        objects[int(number)] = (dictionary, stream)
+    return objects
+
+
+def test_reportlab_is_the_pinned_version():
+    # draw_xobject and the watermark asset use ReportLab internals; check
+    # the tests below before moving this pin.
+    with open(REQUIREMENTS) as f:
+        pins = dict(line.strip().split("==") for line in f if "==" in line)
+    assert reportlab.Version == pins["reportlab"]
+
+
+def test_watermark_is_embedded_in_every_document():
+    # The prebuilt watermark is shared between documents; each must get its own copy.
+    for _ in range(3):
+        objects = pdf_objects(render_certificate_pdf(RECORD))
+        [reference] = {
+            int(number) for dictionary, _ in objects.values()
+            for number in re.findall(rb"/" + WATERMARK.encode() + rb" (\d+) 0 R", dictionary)
+        }
+        image, data = objects[reference]
+        assert b"/Subtype /Image" in image
+        assert b"/Width 800" in image and b"/Height 800" in image
+        assert data
+        [smask] = re.findall(rb"/SMask (\d+) 0 R", image)
+        assert b"/Subtype /Image" in objects[int(smask)][0]
+        assert any(data and f"/{WATERMARK} Do".encode() in data for _, data in objects.values())
+
+
+def test_prebuilt_watermark_renders_like_draw_image(monkeypatch):
+    pymupdf = pytest.importorskip("pymupdf")
+
+    def rasterize(pdf_bytes):
+        with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+            assert doc.page_count == 1
+            return doc[0].get_pixmap(dpi=50).samples
+
+    prebuilt = rasterize(render_certificate_pdf(RECORD))
+    monkeypatch.setattr(templates, "_has_canvas_internals", lambda c: False)
+    redrawn = rasterize(render_certificate_pdf(RECORD))
+
+    assert len(prebuilt) == len(redrawn)
+    differences = sum(abs(a - b) for a, b in zip(prebuilt, redrawn))
+    assert differences / len(prebuilt) < 0.5
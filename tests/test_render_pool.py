@@ -0,0 +1,48 @@
+import os
+import time
+import signal
+import asyncio
+
+import pytest
+
+from src.core.certificate_renderer import issue_certificate_record
+from src.core.render_pool import RenderPool
+
+RECORD = issue_certificate_record({
+    "student_name": "Ana Silva",
+    "course_name": "Kubernetes Fundamentals",
+    "issue_date": "2025-03-01",
+})
+
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(workers=1, max_pending=4)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def test_render_after_a_worker_is_killed(pool):
+    pid = pool._executor.submit(os.getpid).result()
+    os.kill(pid, signal.SIGKILL)
+    # Let the executor notice, as it would between two requests.
+    time.sleep(0.5)
+
+    pdf = asyncio.run(pool.render(RECORD))
+
+    assert pdf.startswith(b"%PDF")
+    assert pool.ready
+    assert pool.stats()["restarts"] == 1
+    assert pool._executor.submit(os.getpid).result() != pid
+
+
+def test_concurrent_renders_replace_the_pool_once(pool):
+    os.kill(pool._executor.submit(os.getpid).result(), signal.SIGKILL)
+    time.sleep(0.5)
+
+    async def render_three():
+        return await asyncio.gather(*(pool.render(RECORD) for _ in range(3)))
+
+    assert all(pdf.startswith(b"%PDF") for pdf in asyncio.run(render_three()))
+    assert pool.stats()["restarts"] == 1
@@ -0,0 +1,64 @@
+from src.core.validation_snapshot import SNAPSHOT_FIELDS, ValidationSnapshot, export_snapshot
+
+
+def make_records(count, course="Snapshot Course"):
+    records = []
+    for number in range(count):
+        record = {
+            # Varying lengths exercise the NUL padding of the id column.
+            "id": f"KC-2025{number % 7:0{1 + number % 3}d}-{number:06X}",
+            "verification_code": f"CODE{number}",
+            "student_name": f"Estudante Nº {number} – Ünïcode",
+            "course_name": course,
+            "issue_date": "2025-06-01",
+        }
+        if number % 2:
+            record["hours"] = number
+        records.append(record)
+    return records
+
+
+def expected(record):
+    return {"id": record["id"], **{field: str(record.get(field) or "") for field in SNAPSHOT_FIELDS}}
+
+
+def test_every_exported_record_is_found(tmp_path):
+    path = str(tmp_path / "validation.snapshot")
+    records = make_records(300)
+    assert export_snapshot(records, path) == 300
+
+    snapshot = ValidationSnapshot(path)
+    assert snapshot.count() == 300
+    for record in records:
+        assert snapshot.get(record["id"]) == expected(record)
+    assert list(snapshot.iter_ids()) == sorted(record["id"] for record in records)
+    found = snapshot.get_many([records[5]["id"], "KC-000000-MISSING"])
+    assert found == {records[5]["id"]: expected(records[5])}
+
+
+def test_missing_ids_are_not_found(tmp_path):
+    path = str(tmp_path / "validation.snapshot")
+    export_snapshot(make_records(50), path)
+    snapshot = ValidationSnapshot(path)
+
+    for cert_id in ("KC-202500-FFFFFF", "A", "ZZZ", "KC-2025" + "0" * 40, ""):
+        assert snapshot.get(cert_id) is None
+
+    export_snapshot([], path)
+    assert snapshot.count() == 0
+    assert snapshot.get("A") is None
+
+
+def test_open_reader_sees_a_replacing_export(tmp_path):
+    path = str(tmp_path / "validation.snapshot")
+    old, new = make_records(20, "Old Course"), make_records(30, "New Course")[20:]
+    export_snapshot(old, path)
+    snapshot = ValidationSnapshot(path)
+    assert snapshot.get(old[0]["id"])["course_name"] == "Old Course"
+
+    export_snapshot(new, path)
+
+    assert snapshot.count() == 10
+    assert snapshot.get(old[0]["id"]) is None
+    for record in new:
+        assert snapshot.get(record["id"]) == expected(record)
@@ -0,0 +1,40 @@
+from src.core.certificate_renderer import CertificateDB, issue_certificate_record
+
+
+def stored_record():
+    record = issue_certificate_record({
+        "student_name": "Web Student",
+        "course_name": "Web Course",
+        "issue_date": "2025-08-01",
+        "instructor": "Ada",
+    })
+    CertificateDB().save_certificate(record)
+    return record
+
+
+def test_validate_page_returns_certificate_data(client):
+    record = stored_record()
+
+    response = client.get(
+        "/validate",
+        params={"certificate_id": record["id"], "verification_code": record["verification_code"]},
+        headers={"Accept": "application/json"},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["valid"] is True
+    assert body["certificate_data"]["student_name"] == "Web Student"
+    assert body["certificate_data"]["instructor"] == "Ada"
+
+
+def test_view_and_download_render_the_stored_record(client):
+    record = stored_record()
+    params = {"certificate_id": record["id"], "verification_code": record["verification_code"]}
+
+    view = client.get("/view", params=params)
+    download = client.get("/download", params=params)
+
+    assert view.status_code == 200 and view.content.startswith(b"%PDF")
+    assert download.status_code == 200 and download.content == view.content
+    assert client.get("/view", params={**params, "verification_code": "wrong"}).status_code == 404